@@ -40,9 +40,11 @@ INSTALLED_APPS = [
     'api',
     'rest_framework',
     'django_filters',
+    'instrumentation',
 ]
 
 MIDDLEWARE = [
+    'instrumentation.middleware.InstrumentationMiddleware',  # first, so timings cover the whole chain
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +54,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+INSTRUMENTATION = {
+    'ENABLED': True,  # query counts, N+1 warnings, Server-Timing and /metrics/
+    'SERVER_TIMING': 'staff',  # header for staff users and DEBUG only; True for everyone, False for no one
+    'DUPLICATE_THRESHOLD': 3,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
 ROOT_URLCONF = 'advanced_api_project.urls'
 
 TEMPLATES = [
@@ -123,3 +132,26 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Django REST Framework settings
+REST_FRAMEWORK = {
+    # Page numbers by default, ?cursor= for cursor pages (see api/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.ListPagination',
+    'PAGE_SIZE': 20,
+}
+
+# Page-number responses count at most EXACT_COUNT_LIMIT rows exactly; larger
+# results get an estimated count from table statistics or a cached count
+API_PAGINATION = {
+    'MAX_PAGE_SIZE': 100,
+    'EXACT_COUNT_LIMIT': 1000,
+    'COUNT_CACHE_TTL': 300,  # seconds
+}
+
+# Cached BookListView result sets (ordered primary keys per filter combination)
+# Point CACHE_ALIAS at a shared cache (Redis, memcached) when running several workers
+BOOK_RESULT_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 300,  # seconds
+    'MAX_IDS': 10000,
+}
@@ -19,5 +19,6 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('', include('instrumentation.urls')),  # /metrics/ for Prometheus
     path('api/', include('api.urls')), 
 ]
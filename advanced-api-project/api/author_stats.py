@@ -0,0 +1,63 @@
+"""
+Denormalized per-author counters.
+
+``Author.book_count`` and ``Author.latest_publication_year`` are stored on
+the author row, so lists can show and order by them without counting
+``author.books`` at read time (``api_author_book_count_idx`` serves
+``ORDER BY book_count DESC``).
+
+``refresh_author_stats`` recomputes them with one ``UPDATE`` over correlated
+``COUNT`` / ``MAX`` subqueries. Those are answered from the
+``(author, publication_year)`` index on ``Book``. It is called:
+
+* by the ``Book`` receivers in ``api.models``, inside the transaction of the
+  save or delete, for the old and new author;
+* by ``BookQuerySet.bulk_create`` and ``BookQuerySet.update``, which send
+  no signals;
+* for every author by the ``repair_author_stats`` management command.
+"""
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTER_FIELDS = ('book_count', 'latest_publication_year')
+
+
+def computed_stats(book_model):
+    books = book_model.objects.filter(author=OuterRef('pk')).order_by().values('author')
+    return {
+        'book_count': Coalesce(
+            Subquery(books.annotate(count=Count('pk')).values('count')), 0, output_field=IntegerField()
+        ),
+        'latest_publication_year': Subquery(books.annotate(latest=Max('publication_year')).values('latest')),
+    }
+
+
+def refresh_author_stats(author_ids=None, author_model=None, book_model=None):
+    """
+    Recompute the counters of ``author_ids`` (every author when ``None``)
+    and return the number of authors updated. Takes the models so
+    migrations can pass historical ones.
+    """
+    if author_model is None:
+        from .models import Author as author_model
+    if book_model is None:
+        from .models import Book as book_model
+
+    authors = author_model.objects.all()
+    if author_ids is not None:
+        author_ids = {pk for pk in author_ids if pk is not None}
+        if not author_ids:
+            return 0
+        authors = authors.filter(pk__in=author_ids)
+    return authors.update(**computed_stats(book_model))
+
+
+def drifted_author_ids():
+    """Primary keys of authors whose stored counters disagree with their books."""
+    from .models import Author, Book
+
+    rows = Author.objects.annotate(
+        **{f'actual_{name}': expression for name, expression in computed_stats(Book).items()}
+    ).values_list('pk', *COUNTER_FIELDS, *(f'actual_{name}' for name in COUNTER_FIELDS))
+    return [pk for pk, count, latest, actual_count, actual_latest in rows
+            if (count, latest) != (actual_count, actual_latest)]
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importer import CHUNK_SIZE, IMPORT_FORMATS, BookImportError, detect_format, import_books
+from api.models import ImportCheckpoint
+
+
+class Command(BaseCommand):
+    help = 'Import books and their authors from a CSV or NDJSON file, resuming from a checkpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--checkpoint', help='Checkpoint name; defaults to the file name.')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first row.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'{path} does not exist.')
+        import_format = options['format'] or detect_format(path.name)
+        if import_format is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format.')
+        checkpoint = options['checkpoint'] or path.name
+        if options['restart']:
+            ImportCheckpoint.objects.filter(name=checkpoint).delete()
+
+        with path.open(encoding='utf-8-sig', newline='') as stream:
+            try:
+                result = import_books(stream, import_format, checkpoint=checkpoint, chunk_size=options['chunk_size'])
+            except BookImportError as exc:
+                raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {' '.join(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.books_created} book(s) and {result.authors_created} new author(s); '
+            f'skipped {result.rows_skipped} invalid row(s). Checkpoint {checkpoint!r} at row {result.position}.'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.author_stats import drifted_author_ids, refresh_author_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute Author.book_count and Author.latest_publication_year from the books table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report authors whose counters drifted.')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drifted = drifted_author_ids()
+            self.stdout.write(f'{len(drifted)} author(s) with stale counters.')
+            if drifted:
+                self.stdout.write('ids: ' + ', '.join(str(pk) for pk in drifted[:50]))
+            return
+        updated = refresh_author_stats()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed counters for {updated} author(s).'))
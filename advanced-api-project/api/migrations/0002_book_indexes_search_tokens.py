@@ -0,0 +1,57 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_tokens(apps, schema_editor):
+    from api.search import rebuild_index
+    rebuild_index(apps.get_model('api', 'Book'), apps.get_model('api', 'BookSearchToken'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='books', to='api.author'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title', 'publication_year'], name='api_book_title_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publication_year', 'title'], name='api_book_year_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author', 'title'], name='api_book_author_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author', 'publication_year'], name='api_book_author_year_idx'),
+        ),
+        migrations.AddField(
+            model_name='booksearchtoken',
+            name='book',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='api.book'),
+        ),
+        migrations.AddConstraint(
+            model_name='booksearchtoken',
+            constraint=models.UniqueConstraint(fields=('token', 'book'), name='api_booksearchtoken_token_book_uniq'),
+        ),
+        migrations.RunPython(build_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:42
+
+from django.db import migrations, models
+
+
+def fill_author_stats(apps, schema_editor):
+    from api.author_stats import refresh_author_stats
+    refresh_author_stats(author_model=apps.get_model('api', 'Author'), book_model=apps.get_model('api', 'Book'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='latest_publication_year',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['-book_count', 'name'], name='api_author_book_count_idx'),
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
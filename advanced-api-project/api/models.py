@@ -1,20 +1,171 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 class Author(models.Model):
     # Represents an author with a name.
     # An author can write multiple books (one-to-many relationship).
     name = models.CharField(max_length=255)
+    # Denormalized from the author's books; maintained by api.author_stats
+    book_count = models.PositiveIntegerField(default=0, editable=False)
+    latest_publication_year = models.IntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-book_count', 'name'], name='api_author_book_count_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Never write back counters that may have changed since this instance was loaded
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            from .author_stats import COUNTER_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class BookQuerySet(models.QuerySet):
+    # Bulk writes send no signals, so they refresh the author counters and
+    # retire cached book lists themselves. Versions are bumped on commit, so
+    # no request can re-cache the rows from before the write
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .author_stats import refresh_author_stats
+        from .result_cache import bump_version
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            refresh_author_stats({obj.author_id for obj in objs})
+        transaction.on_commit(bump_version, using=self.db)
+        return objs
+
+    def update(self, **kwargs):
+        from .result_cache import bump_version
+        if not {'author', 'author_id', 'publication_year'} & set(kwargs):
+            rows = super().update(**kwargs)
+            transaction.on_commit(bump_version, using=self.db)
+            return rows
+        from .author_stats import refresh_author_stats
+        with transaction.atomic(using=self.db):
+            author_ids = set(self.values_list('author_id', flat=True))
+            rows = super().update(**kwargs)
+            new_author = kwargs.get('author_id', kwargs.get('author'))
+            if isinstance(new_author, Author):
+                new_author = new_author.pk
+            if new_author is None or isinstance(new_author, int):
+                refresh_author_stats(author_ids | {new_author})
+            else:
+                # An expression; any author may have gained books
+                refresh_author_stats()
+        transaction.on_commit(bump_version, using=self.db)
+        return rows
+
 
 class Book(models.Model):
     # Represents a book with a title, publication year, and associated author.
     # Each book belongs to one author.
     title = models.CharField(max_length=255)
     publication_year = models.IntegerField()
-    author = models.ForeignKey(Author, related_name='books', on_delete=models.CASCADE)
+    # Indexed through the (author, ...) composite indexes below
+    author = models.ForeignKey(Author, related_name='books', on_delete=models.CASCADE, db_index=False)
+
+    objects = BookQuerySet.as_manager()
+
+    class Meta:
+        # One index per filterset field / ordering field pair used by BookListView,
+        # so filtered lists come back already sorted
+        indexes = [
+            models.Index(fields=['title', 'publication_year'], name='api_book_title_year_idx'),
+            models.Index(fields=['publication_year', 'title'], name='api_book_year_title_idx'),
+            models.Index(fields=['author', 'title'], name='api_book_author_title_idx'),
+            models.Index(fields=['author', 'publication_year'], name='api_book_author_year_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.publication_year})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the receivers refresh the previous author when a book moves
+        instance._loaded_author_id = instance.__dict__.get('author_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Commit the row and the author counters (post_save) together
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
+
+
+class BookSearchToken(models.Model):
+    # One row per distinct word of a book's title and author name,
+    # maintained by the receivers below (see api.search).
+    book = models.ForeignKey(Book, related_name='search_tokens', on_delete=models.CASCADE)
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'book'], name='api_booksearchtoken_token_book_uniq'),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    # Rows of an import file committed so far, keyed by an import name
+    # (see api.importer). Re-running an import resumes after ``position``.
+    name = models.CharField(max_length=255, unique=True)
+    position = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.title} ({self.publication_year})"
\ No newline at end of file
+        return f"{self.name} @ {self.position}"
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .search import index_books
+    index_books([instance])
+
+
+@receiver(post_save, sender=Author)
+def reindex_author_books(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    from .search import index_books
+    index_books(instance.books.select_related('author'))
+
+
+@receiver(post_save, sender=Book)
+def update_author_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .author_stats import refresh_author_stats
+    refresh_author_stats({instance.author_id, getattr(instance, '_loaded_author_id', None)})
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(post_delete, sender=Book)
+def update_author_stats_on_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Author):
+        # The author is going away with its books
+        return
+    from .author_stats import refresh_author_stats
+    refresh_author_stats({instance.author_id})
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_book_lists(sender, using=None, **kwargs):
+    from .result_cache import bump_version
+    transaction.on_commit(bump_version, using=using)
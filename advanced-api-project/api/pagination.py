@@ -0,0 +1,191 @@
+"""
+Pagination for the list endpoints.
+
+``ListPagination`` is page-number pagination (``?page=``, ``?page_size=``)
+that switches to DRF's cursor pagination when the request carries a
+``cursor`` query parameter (``?cursor=`` for the first page). Cursor pages
+follow the view's ``OrderingFilter`` ordering and never count rows.
+
+Page-number mode needs a total. Counting every matching row is what gets
+slow on large tables, so ``EstimatedCountPaginator`` counts at most
+``EXACT_COUNT_LIMIT + 1`` rows. Beyond that the count is an estimate and the
+response says so with ``count_is_estimate``:
+
+* an unfiltered table uses the planner statistics (``sqlite_stat1`` after
+  ``ANALYZE``, ``pg_class.reltuples`` on PostgreSQL);
+* otherwise the exact count is computed once and cached; repeat requests
+  skip counting altogether. The cache key includes the ``api.result_cache``
+  version, so writes retire it.
+
+While the count is an estimate, ``next`` is decided by fetching one extra
+row, so pages past the estimated end stay reachable.
+
+Configured through the ``API_PAGINATION`` setting::
+
+    API_PAGINATION = {
+        'MAX_PAGE_SIZE': 100,
+        'EXACT_COUNT_LIMIT': 1000,  # larger results get an estimated count
+        'COUNT_CACHE_TTL': 300,     # seconds
+    }
+"""
+import hashlib
+from functools import cached_property
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+from .result_cache import get_cache, get_version
+
+DEFAULTS = {
+    'MAX_PAGE_SIZE': 100,
+    'EXACT_COUNT_LIMIT': 1000,
+    'COUNT_CACHE_TTL': 300,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'API_PAGINATION', {})}
+
+
+def table_row_estimate(model, using):
+    """Row count from the planner statistics, or ``None`` if there are none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+            rows = [int(stat.split()[0]) for stat, in cursor.fetchall() if stat]
+            return max(rows) if rows else None
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] >= 0 else None
+    return None
+
+
+def estimate_count(queryset):
+    """Return ``(count, is_estimate)`` for ``queryset``."""
+    config = get_config()
+    limit = config['EXACT_COUNT_LIMIT']
+    queryset = queryset.order_by()
+    sql, params = queryset.values('pk').query.sql_with_params()
+    digest = hashlib.sha1(repr((sql, params)).encode('utf-8')).hexdigest()
+    key = f'api:count:{get_version()}:{digest}'
+    cache = get_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached, True
+
+    count = queryset[:limit + 1].count()
+    if count <= limit:
+        return count, False
+    if not queryset.query.where:
+        estimate = table_row_estimate(queryset.model, queryset.db)
+        if estimate is not None:
+            # Never report fewer rows than were just seen
+            return max(estimate, count), True
+
+    count = queryset.count()
+    cache.set(key, count, timeout=config['COUNT_CACHE_TTL'])
+    return count, True
+
+
+class EstimatedPage(Page):
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """Django paginator whose ``count`` may be estimated (see the module docstring)."""
+
+    @cached_property
+    def count_and_estimate(self):
+        if isinstance(self.object_list, list):
+            # Cached primary keys (api.result_cache): the length is exact and free
+            return len(self.object_list), False
+        return estimate_count(self.object_list)
+
+    @cached_property
+    def count(self):
+        return self.count_and_estimate[0]
+
+    @property
+    def count_is_estimate(self):
+        return self.count_and_estimate[1]
+
+    def page(self, number):
+        if not self.count_is_estimate:
+            return super().page(number)
+        # validate_number would also reject pages past num_pages, which may be too low here
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return EstimatedPage(rows[:self.per_page], number, self, has_more=len(rows) > self.per_page)
+
+
+class ListCursorPagination(CursorPagination):
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return get_config()['MAX_PAGE_SIZE']
+
+
+class ListPagination(PageNumberPagination):
+    django_paginator_class = EstimatedCountPaginator
+    page_size_query_param = 'page_size'
+    cursor_class = ListCursorPagination
+    cursor = None
+
+    @property
+    def max_page_size(self):
+        return get_config()['MAX_PAGE_SIZE']
+
+    def requires_queryset(self, request):
+        """Cursor pages filter on the ordering columns, so they cannot slice a list."""
+        return self.cursor_class.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.requires_queryset(request):
+            self.cursor = self.cursor_class()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        self.cursor = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return Response({
+            'count': self.page.paginator.count,
+            'count_is_estimate': self.page.paginator.count_is_estimate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response['properties']['count_is_estimate'] = {'type': 'boolean', 'example': False}
+        return response
+
+    def to_html(self):
+        if self.cursor is not None:
+            return self.cursor.to_html()
+        return super().to_html()
@@ -0,0 +1,145 @@
+"""
+Prefetch planning for nested serializers.
+
+A serializer's nested fields already say which relations it will walk.
+``plan_queryset`` reads them and adds the matching ``select_related`` /
+``prefetch_related`` calls to a queryset, so a list of N objects costs one
+query per relation rather than one per object:
+
+* a nested serializer with ``many=True`` (e.g. ``AuthorSerializer.books``)
+  becomes ``Prefetch(source, queryset=...)``, and the nested serializer's
+  own relations are planned on that inner queryset;
+* a nested single serializer over a forward relation becomes
+  ``select_related``;
+* a primary-key list over a to-many relation becomes a ``Prefetch`` that
+  only loads the keys.
+
+Serializers using ``PrefetchingSerializerMixin`` can name the base queryset
+for a relation in ``Meta.prefetch_querysets`` (for example, to order nested
+rows). When the serializer context carries ``max_depth``, nesting stops at
+that depth: deeper relations are rendered as primary keys and are not
+prefetched. Views get all of this from ``PrefetchingViewMixin``.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+
+
+class PrefetchingSerializerMixin:
+    def get_fields(self):
+        fields = super().get_fields()
+        max_depth = self.context.get('max_depth')
+        if max_depth is None or self.nesting_level() < max_depth:
+            return fields
+        for name, field in fields.items():
+            many = isinstance(field, serializers.ListSerializer)
+            if isinstance(field.child if many else field, serializers.BaseSerializer):
+                kwargs = {'source': field.source} if field.source else {}
+                fields[name] = serializers.PrimaryKeyRelatedField(many=many, read_only=True, **kwargs)
+        return fields
+
+    def nesting_level(self):
+        # Serializers above this one, not counting the ListSerializer wrappers
+        level, node = 0, self.parent
+        while node is not None:
+            if not isinstance(node, serializers.ListSerializer):
+                level += 1
+            node = node.parent
+        return level
+
+    def get_prefetch_queryset(self, field_name, model):
+        querysets = getattr(self.Meta, 'prefetch_querysets', {})
+        if field_name in querysets:
+            return querysets[field_name].all()
+        return model._default_manager.all()
+
+
+def plan_queryset(serializer, queryset):
+    """Return ``queryset`` with the relations ``serializer`` reads preloaded."""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    select, prefetch = _plan(serializer, queryset.model, prefix='')
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def _plan(serializer, model, prefix):
+    select, prefetch = [], []
+    for name, field in serializer.fields.items():
+        if field.write_only or field.source == '*':
+            continue
+        source = field.source.replace('.', '__')
+        relation = _relation(model, source)
+        if relation is None:
+            continue
+        related_model = relation.related_model
+        path = prefix + source
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            inner = _base_queryset(serializer, name, related_model)
+            prefetch.append(Prefetch(path, queryset=plan_queryset(child, inner)))
+        elif isinstance(field, ManyRelatedField):
+            inner = _base_queryset(serializer, name, related_model)
+            if relation.one_to_many:
+                # Prefetching a reverse FK needs the FK column to match rows back up
+                inner = inner.only('pk', relation.field.attname)
+            prefetch.append(Prefetch(path, queryset=inner))
+        elif isinstance(field, serializers.BaseSerializer) and not relation.many_to_many \
+                and not relation.one_to_many:
+            select.append(path)
+            nested_select, nested_prefetch = _plan(field, related_model, path + '__')
+            select.extend(nested_select)
+            prefetch.extend(nested_prefetch)
+    return select, prefetch
+
+
+def _relation(model, source):
+    if '__' in source:
+        return None
+    try:
+        field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        # Properties and methods; nothing to plan
+        return None
+    return field if field.is_relation else None
+
+
+def _base_queryset(serializer, name, model):
+    if isinstance(serializer, PrefetchingSerializerMixin):
+        return serializer.get_prefetch_queryset(name, model)
+    return model._default_manager.all()
+
+
+class PrefetchingViewMixin:
+    """
+    Generic view mixin that plans the queryset from the serializer class and
+    supports ``?depth=`` to bound nesting (capped by ``max_depth``).
+    """
+    depth_query_param = 'depth'
+    max_depth = None
+
+    def get_depth(self):
+        depth = self.max_depth
+        value = self.request.query_params.get(self.depth_query_param)
+        if value is not None:
+            try:
+                value = int(value)
+            except ValueError:
+                return depth
+            if value >= 0:
+                depth = value if depth is None else min(value, depth)
+        return depth
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['max_depth'] = self.get_depth()
+        return context
+
+    def get_queryset(self):
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        return plan_queryset(serializer, super().get_queryset())
@@ -0,0 +1,133 @@
+"""
+Cached result sets for book list queries.
+
+Clients repeat the same filter / search / ordering combinations, so
+``CachedResultSetMixin`` stores the ordered list of matching primary keys
+under a key built from the normalized parameters. A repeat request skips the
+filtering and sorting query. It only loads the rows it serializes, by
+primary key, and slices the cached list when a paginator is configured.
+Paginators that must filter the queryset themselves (cursor pages) bypass
+the cache.
+
+Every key embeds a version number. Receivers in ``api.models`` bump it
+whenever a ``Book`` or ``Author`` is saved or deleted, and so do
+``BookQuerySet.bulk_create`` / ``update``, which send no signals. Bumps run
+on transaction commit: bumping earlier would let a concurrent request cache
+the pre-write rows under the new version. A bump retires all cached lists
+at once; entries also expire after ``TTL`` seconds.
+
+Result sets longer than ``MAX_IDS`` are served by the normal list query. A
+marker stored under their key records that, so the bounded probe for them
+runs once per version rather than on every request.
+
+Configured through the ``BOOK_RESULT_CACHE`` setting::
+
+    BOOK_RESULT_CACHE = {
+        'CACHE_ALIAS': 'default',
+        'TTL': 300,           # seconds
+        'MAX_IDS': 10000,     # larger result sets are not cached
+    }
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .search import tokenize
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 300,
+    'MAX_IDS': 10000,
+}
+
+VERSION_KEY = 'api:books:version'
+# Cached in place of the pk list for result sets over MAX_IDS
+TOO_LARGE = 'too-large'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BOOK_RESULT_CACHE', {})}
+
+
+def get_cache():
+    return caches[get_config()['CACHE_ALIAS']]
+
+
+def get_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost counter never reuses an old version
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+class CachedResultSetMixin:
+    """
+    List view mixin caching the ordered primary keys of ``filter_queryset``.
+    Only the query parameters read by the view's filter backends are part
+    of the key.
+    """
+    result_cache_prefix = 'api:books:list'
+
+    def get_result_cache_params(self):
+        params = {'search', 'ordering'}
+        params.update(getattr(self, 'filterset_fields', ()))
+        return params
+
+    def get_result_cache_key(self, request):
+        normalized = {}
+        for name in sorted(self.get_result_cache_params() & set(request.query_params)):
+            values = [value.strip() for value in request.query_params.getlist(name) if value.strip()]
+            if name == 'search':
+                # Terms are ANDed word prefixes, so order and case do not matter
+                values = sorted(tokenize(*values))
+            if values:
+                normalized[name] = values
+        normalized.setdefault('ordering', list(getattr(self, 'ordering', None) or []))
+        digest = hashlib.sha1(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+        return f'{self.result_cache_prefix}:{get_version()}:{digest}'
+
+    def get_result_pks(self, request):
+        config = get_config()
+        cache = get_cache()
+        key = self.get_result_cache_key(request)
+        pks = cache.get(key)
+        if pks is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            pks = list(queryset.values_list('pk', flat=True)[:config['MAX_IDS'] + 1])
+            if len(pks) > config['MAX_IDS']:
+                pks = TOO_LARGE
+            cache.set(key, pks, timeout=config['TTL'])
+        return None if pks == TOO_LARGE else pks
+
+    def list(self, request, *args, **kwargs):
+        requires_queryset = getattr(self.paginator, 'requires_queryset', None)
+        if requires_queryset is not None and requires_queryset(request):
+            return super().list(request, *args, **kwargs)
+        pks = self.get_result_pks(request)
+        if pks is None:
+            return super().list(request, *args, **kwargs)
+
+        page = self.paginate_queryset(pks)
+        ids = pks if page is None else page
+        objects = self.get_queryset().in_bulk(ids) if ids else {}
+        # Rows deleted since the list was cached are skipped
+        rows = [objects[pk] for pk in ids if pk in objects]
+        serializer = self.get_serializer(rows, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
@@ -0,0 +1,94 @@
+"""
+Word-prefix search over a prebuilt token table.
+
+``SearchFilter`` runs ``title LIKE '%term%' OR author.name LIKE '%term%'``,
+which scans every book and joins every author. Instead, each book's title
+and author name are split into normalized words and stored in
+``BookSearchToken``, which is kept in sync by receivers in ``api.models``.
+A search term matches a book when one of its words starts with the term.
+That lookup is a range scan on the ``(token, book)`` unique index, so no
+join and no table scan are needed.
+
+Terms are split the same way as ``SearchFilter`` splits them, and every
+term has to match. Matching is case-insensitive and ignores accents.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from rest_framework.filters import SearchFilter
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TOKEN_LENGTH = 64
+INDEXED_FIELDS = ('title', 'author__name')
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(*texts):
+    return {
+        token[:MAX_TOKEN_LENGTH]
+        for text in texts
+        for token in TOKEN_RE.findall(normalize(text))
+    }
+
+
+def index_books(books, token_model=None):
+    """(Re)build the tokens of ``books``, which should have ``author`` loaded."""
+    if token_model is None:
+        from .models import BookSearchToken as token_model
+
+    books = list(books)
+    rows = [
+        token_model(book=book, token=token)
+        for book in books
+        for token in tokenize(book.title, book.author.name)
+    ]
+    with transaction.atomic():
+        token_model.objects.filter(book__in=[book.pk for book in books]).delete()
+        token_model.objects.bulk_create(rows, batch_size=1000)
+
+
+def rebuild_index(book_model, token_model, chunk_size=1000):
+    """Index every book; takes the models so migrations can pass historical ones."""
+    queryset = book_model.objects.select_related('author').order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        index_books(chunk, token_model)
+        last_pk = chunk[-1].pk
+
+
+def token_search(queryset, terms):
+    from .models import BookSearchToken
+
+    for term in terms:
+        for token in tokenize(term):
+            # token <= word < token + U+10FFFF is "word starts with token", as an index range
+            matches = BookSearchToken.objects.filter(
+                token__gte=token, token__lt=token + '\U0010ffff'
+            ).values('book_id')
+            queryset = queryset.filter(pk__in=matches)
+    return queryset
+
+
+class TokenSearchFilter(SearchFilter):
+    """
+    ``SearchFilter`` answered from ``BookSearchToken``. Views whose
+    ``search_fields`` are not all indexed fall back to the stock filter.
+    """
+    indexed_fields = INDEXED_FIELDS
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        if not search_fields or not set(search_fields) <= set(self.indexed_fields):
+            return super().filter_queryset(request, queryset, view)
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return token_search(queryset, terms)
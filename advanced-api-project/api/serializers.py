@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Author, Book
+from .prefetch import PrefetchingSerializerMixin
 from datetime import datetime
 
 class BookSerializer(serializers.ModelSerializer):
@@ -18,12 +19,15 @@ class BookSerializer(serializers.ModelSerializer):
             )
         return value
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(PrefetchingSerializerMixin, serializers.ModelSerializer):
     # Serializes the Author model.
     # Includes a nested representation of all books written by this author.
     # The 'books' field uses BookSerializer to show full book details.
+    # Views using PrefetchingViewMixin prefetch 'books' in one query.
+    # book_count / latest_publication_year are stored counters (read-only).
     books = BookSerializer(many=True, read_only=True)
 
     class Meta:
         model = Author
-        fields = ['id', 'name', 'books']
\ No newline at end of file
+        fields = ['id', 'name', 'book_count', 'latest_publication_year', 'books']
+        prefetch_querysets = {'books': Book.objects.order_by('publication_year', 'id')}
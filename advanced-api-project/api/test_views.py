@@ -1,8 +1,18 @@
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Author, Book
+from .importer import import_books
+from .models import Author, Book, ImportCheckpoint
 
 
 class BookAPITestCase(TestCase):
@@ -19,7 +29,7 @@ class BookAPITestCase(TestCase):
     def test_list_books(self):
         response = self.client.get('/api/books/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data['count'], 1)
 
     def test_get_book_detail(self):
         response = self.client.get(f'/api/books/{self.book.id}/')
@@ -68,25 +78,391 @@ class BookAPITestCase(TestCase):
     def test_filter_by_year(self):
         Book.objects.create(title="New Book", publication_year=2020, author=self.author)
         response = self.client.get('/api/books/?publication_year=1949')
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], '1984')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['title'], '1984')
 
     def test_search_by_title(self):
         response = self.client.get('/api/books/?search=1984')
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data['count'], 1)
 
     def test_search_by_author(self):
         response = self.client.get('/api/books/?search=Orwell')
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data['count'], 1)
 
     def test_ordering_by_year(self):
         Book.objects.create(title="New Book", publication_year=2020, author=self.author)
         response = self.client.get('/api/books/?ordering=publication_year')
-        years = [book['publication_year'] for book in response.data]
+        years = [book['publication_year'] for book in response.data['results']]
         self.assertEqual(years, [1949, 2020])
 
     def test_ordering_by_title_desc(self):
         Book.objects.create(title="Animal Farm", publication_year=1945, author=self.author)
         response = self.client.get('/api/books/?ordering=-title')
-        titles = [book['title'] for book in response.data]
-        self.assertEqual(titles, ['Animal Farm', '1984'])  # Fixed!
\ No newline at end of file
+        titles = [book['title'] for book in response.data['results']]
+        self.assertEqual(titles, ['Animal Farm', '1984'])  # Fixed!
+
+class AuthorAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def create_authors(self, count):
+        for i in range(count):
+            author = Author.objects.create(name=f"Author {i}")
+            Book.objects.create(title=f"Second {i}", publication_year=2001, author=author)
+            Book.objects.create(title=f"First {i}", publication_year=1999, author=author)
+
+    def test_author_list_query_count_is_constant(self):
+        self.create_authors(2)
+        # Page count, authors, books
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/authors/')
+        self.assertEqual(response.data['count'], 2)
+        self.create_authors(8)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/authors/')
+        self.assertEqual(response.data['count'], 10)
+
+    def test_nested_books_are_ordered(self):
+        self.create_authors(1)
+        response = self.client.get('/api/authors/')
+        self.assertEqual([book['title'] for book in response.data['results'][0]['books']], ['First 0', 'Second 0'])
+
+    def test_bounded_depth_returns_book_ids(self):
+        self.create_authors(3)
+        author = Author.objects.get(name="Author 0")
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/authors/?depth=0')
+        self.assertEqual(
+            response.data['results'][0]['books'],
+            list(author.books.order_by('publication_year', 'id').values_list('id', flat=True)),
+        )
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/authors/{author.id}/?depth=1')
+        self.assertEqual(response.data['books'][0]['title'], 'First 0')
+
+
+class BookSearchIndexTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = Author.objects.create(name="Gabriel García Márquez")
+        Book.objects.create(title="One Hundred Years of Solitude", publication_year=1967, author=self.author)
+        Book.objects.create(title="Love in the Time of Cholera", publication_year=1985, author=self.author)
+
+    def titles(self, query):
+        return [book['title'] for book in self.client.get(f'/api/books/?{query}').data['results']]
+
+    def test_word_prefix_search_across_title_and_author(self):
+        self.assertEqual(self.titles('search=marq'), ['Love in the Time of Cholera', 'One Hundred Years of Solitude'])
+        self.assertEqual(self.titles('search=GARCIA soli'), ['One Hundred Years of Solitude'])
+        self.assertEqual(self.titles('search=olitude'), [])
+
+    def test_index_follows_renames(self):
+        self.author.name = "Anonymous"
+        self.author.save()
+        self.assertEqual(self.titles('search=marquez'), [])
+        self.assertEqual(len(self.titles('search=anon')), 2)
+        book = Book.objects.get(publication_year=1985)
+        book.title = "Chronicle of a Death Foretold"
+        book.save()
+        self.assertEqual(self.titles('search=chron'), ["Chronicle of a Death Foretold"])
+
+
+class BookQueryPlanTestCase(TestCase):
+    # Every supported filter/ordering combination must be answered from an index,
+    # already in order; searches must only touch the token index.
+    def setUp(self):
+        from django.db import connection
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plans are checked on SQLite')
+        author = Author.objects.create(name="George Orwell")
+        for year in range(1900, 1950):
+            Book.objects.create(title=f"Book {year}", publication_year=year, author=author)
+        self.author = author
+
+    def plan(self, query):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from .views import BookListView
+
+        view = BookListView(format_kwarg=None, args=(), kwargs={})
+        view.request = Request(APIRequestFactory().get(f'/api/books/?{query}'))
+        return view.filter_queryset(view.get_queryset()).explain()
+
+    def test_filters_and_orderings_use_indexes(self):
+        filters = ['', 'title=Book 1901', 'publication_year=1949', f'author={self.author.id}']
+        orderings = ['', 'ordering=title', 'ordering=-title', 'ordering=publication_year',
+                     'ordering=-publication_year']
+        for filter_param in filters:
+            for ordering in orderings:
+                query = '&'.join(part for part in (filter_param, ordering) if part)
+                with self.subTest(query=query):
+                    plan = self.plan(query)
+                    self.assertIn('USING INDEX api_book_', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_search_uses_token_index(self):
+        for query in ['search=orw', 'search=orw book', 'search=orw&publication_year=1949']:
+            with self.subTest(query=query):
+                plan = self.plan(query)
+                self.assertIn('COVERING INDEX sqlite_autoindex_api_booksearchtoken', plan)
+                self.assertNotIn('api_author', plan)
+                self.assertNotIn('SCAN api_book\n', plan + '\n')
+
+
+class BookResultCacheTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.author = Author.objects.create(name="George Orwell")
+        Book.objects.create(title="1984", publication_year=1949, author=self.author)
+        Book.objects.create(title="Animal Farm", publication_year=1945, author=self.author)
+
+    def test_repeat_requests_load_rows_by_pk(self):
+        with self.assertNumQueries(2):
+            first = self.client.get('/api/books/?search=orwell&ordering=-publication_year')
+        # Same parameters after normalization: only the page rows are loaded
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/books/?ordering=-publication_year&search=ORWELL+')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual([book['title'] for book in second.data['results']], ['1984', 'Animal Farm'])
+
+    def test_default_ordering_shares_entry(self):
+        self.client.get('/api/books/')
+        with self.assertNumQueries(1):
+            self.client.get('/api/books/?ordering=title')
+
+    def test_writes_invalidate_cached_lists(self):
+        self.assertEqual(self.client.get('/api/books/?publication_year=1949').data['count'], 1)
+        # Versions are bumped on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title="Homage to Catalonia", publication_year=1949, author=self.author)
+        self.assertEqual(self.client.get('/api/books/?publication_year=1949').data['count'], 2)
+        self.assertEqual(self.client.get('/api/books/?search=orwell').data['count'], 3)
+        self.author.name = "Eric Blair"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        self.assertEqual(self.client.get('/api/books/?search=orwell').data['results'], [])
+
+    def test_writes_keep_cached_lists_until_commit(self):
+        self.assertEqual(self.client.get('/api/books/?publication_year=1949').data['count'], 1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Book.objects.create(title="Homage to Catalonia", publication_year=1949, author=self.author)
+            self.assertEqual(self.client.get('/api/books/?publication_year=1949').data['count'], 1)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_queryset_updates_invalidate_cached_lists(self):
+        self.client.get('/api/books/?ordering=title')
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.filter(title="Animal Farm").update(title="Animal Farm (1945)")
+        response = self.client.get('/api/books/?ordering=title')
+        self.assertEqual([book['title'] for book in response.data['results']], ['1984', 'Animal Farm (1945)'])
+
+    def test_oversized_result_sets_probe_once_per_version(self):
+        from django.test import override_settings
+
+        with override_settings(BOOK_RESULT_CACHE={'MAX_IDS': 1}):
+            self.client.get('/api/books/')
+            # Probe skipped: only the normal count and page queries run
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/books/')
+        self.assertEqual(response.data['count'], 2)
+
+
+class BookImportTestCase(TestCase):
+    CSV = (
+        "title,publication_year,author\n"
+        "Animal Farm,1945,George Orwell\n"
+        "Brave New World,1932,Aldous Huxley\n"
+        "Island,1962,Aldous Huxley\n"
+        "Tomorrow,3000,Aldous Huxley\n"
+        ",1950,Nobody\n"
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.author = Author.objects.create(name="George Orwell")
+        self.client = APIClient()
+
+    def test_import_resolves_authors_and_reports_invalid_rows(self):
+        result = import_books(io.StringIO(self.CSV), 'csv')
+        self.assertEqual(result.books_created, 3)
+        self.assertEqual(result.authors_created, 1)
+        self.assertEqual(result.rows_skipped, 2)
+        self.assertEqual([error['line'] for error in result.errors], [5, 6])
+        self.assertIn('is in the future', result.errors[0]['errors'][0])
+        self.assertEqual(self.author.books.get().title, 'Animal Farm')
+        # bulk_create skips post_save, so the importer indexes and invalidates itself
+        titles = [book['title'] for book in self.client.get('/api/books/?search=huxley').data['results']]
+        self.assertEqual(titles, ['Brave New World', 'Island'])
+
+    def test_queries_per_chunk_do_not_grow_with_rows(self):
+        rows = ''.join(f'{{"title": "Book {i}", "publication_year": 1990, "author": "Author {i % 7}"}}\n'
+                       for i in range(200))
+        with CaptureQueriesContext(connection) as queries:
+            result = import_books(io.StringIO(rows), 'ndjson', chunk_size=100)
+        self.assertEqual((result.books_created, result.authors_created), (200, 7))
+        self.assertLess(len(queries), 30)
+
+    def test_failed_import_resumes_from_checkpoint(self):
+        from . import importer
+
+        index_books = importer.index_books
+        calls = []
+
+        def fail_second_chunk(books):
+            calls.append(len(books))
+            if len(calls) == 2:
+                raise RuntimeError('disk full')
+            index_books(books)
+
+        with mock.patch.object(importer, 'index_books', fail_second_chunk):
+            with self.assertRaises(RuntimeError):
+                import_books(io.StringIO(self.CSV), 'csv', checkpoint='nightly', chunk_size=2)
+        # The failed chunk rolled back together with its checkpoint update
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get(name='nightly').position, 2)
+
+        result = import_books(io.StringIO(self.CSV), 'csv', checkpoint='nightly', chunk_size=2)
+        self.assertEqual((result.books_created, result.position), (1, 5))
+        self.assertEqual(sorted(Book.objects.values_list('title', flat=True)),
+                         ['Animal Farm', 'Brave New World', 'Island'])
+        self.assertEqual(Author.objects.filter(name='Aldous Huxley').count(), 1)
+
+    def test_command_is_idempotent_per_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'books.csv'
+            path.write_text(self.CSV)
+            call_command('import_books', str(path), stdout=io.StringIO(), stderr=io.StringIO())
+            call_command('import_books', str(path), stdout=io.StringIO(), stderr=io.StringIO())
+            self.assertEqual(Book.objects.count(), 3)
+            call_command('import_books', str(path), '--restart', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(Book.objects.count(), 6)
+
+    def test_upload_endpoint(self):
+        upload = SimpleUploadedFile('books.ndjson', b'{"title": "1984", "publication_year": 1949, '
+                                                    b'"author": "George Orwell"}\n')
+        response = self.client.post('/api/books/import/', {'file': upload}, format='multipart')
+        self.assertIn(response.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
+
+        self.client.login(username='testuser', password='testpass')
+        upload.seek(0)
+        response = self.client.post('/api/books/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['books_created'], 1)
+        self.assertEqual(self.author.books.get().title, '1984')
+
+        bad = SimpleUploadedFile('books.xml', b'<books/>')
+        response = self.client.post('/api/books/import/', {'file': bad}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AuthorStatsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.orwell = Author.objects.create(name="George Orwell")
+        self.huxley = Author.objects.create(name="Aldous Huxley")
+
+    def stats(self, author):
+        author.refresh_from_db()
+        return author.book_count, author.latest_publication_year
+
+    def test_counters_follow_book_writes(self):
+        book = Book.objects.create(title="Animal Farm", publication_year=1945, author=self.orwell)
+        Book.objects.create(title="1984", publication_year=1949, author=self.orwell)
+        self.assertEqual(self.stats(self.orwell), (2, 1949))
+
+        book = Book.objects.get(pk=book.pk)
+        book.author = self.huxley
+        book.save()
+        self.assertEqual(self.stats(self.orwell), (1, 1949))
+        self.assertEqual(self.stats(self.huxley), (1, 1945))
+
+        Book.objects.filter(author=self.orwell).delete()
+        self.assertEqual(self.stats(self.orwell), (0, None))
+
+    def test_bulk_paths_and_stale_instances(self):
+        stale = Author.objects.get(pk=self.huxley.pk)
+        Book.objects.bulk_create([
+            Book(title="Brave New World", publication_year=1932, author=self.huxley),
+            Book(title="Island", publication_year=1962, author=self.huxley),
+        ])
+        self.assertEqual(self.stats(self.huxley), (2, 1962))
+        Book.objects.filter(title="Island").update(author=self.orwell)
+        self.assertEqual(self.stats(self.orwell), (1, 1962))
+        self.assertEqual(self.stats(self.huxley), (1, 1932))
+        # Saving an instance loaded earlier must not overwrite the counters
+        stale.name = "A. Huxley"
+        stale.save()
+        self.assertEqual(self.stats(self.huxley), (1, 1932))
+
+    def test_repair_command(self):
+        Book.objects.create(title="1984", publication_year=1949, author=self.orwell)
+        Author.objects.filter(pk=self.orwell.pk).update(book_count=7, latest_publication_year=None)
+        out = io.StringIO()
+        call_command('repair_author_stats', '--check', stdout=out)
+        self.assertIn('1 author(s) with stale counters', out.getvalue())
+        with self.assertNumQueries(1):
+            call_command('repair_author_stats', stdout=io.StringIO())
+        self.assertEqual(self.stats(self.orwell), (1, 1949))
+
+    def test_order_by_book_count_uses_index(self):
+        Book.objects.create(title="1984", publication_year=1949, author=self.orwell)
+        response = self.client.get('/api/authors/?ordering=-book_count&depth=0')
+        self.assertEqual([author['name'] for author in response.data['results']], ["George Orwell", "Aldous Huxley"])
+        self.assertEqual(response.data['results'][0]['book_count'], 1)
+        if connection.vendor == 'sqlite':
+            plan = Author.objects.order_by('-book_count', 'name').explain()
+            self.assertIn('USING INDEX api_author_book_count_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class PaginationTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        for i in range(6):
+            author = Author.objects.create(name=f"Author {i}")
+            Book.objects.create(title=f"Book {i}", publication_year=1990 + i, author=author)
+
+    def test_page_number_mode(self):
+        response = self.client.get('/api/books/?page_size=4&page=2')
+        self.assertEqual((response.data['count'], response.data['count_is_estimate']), (6, False))
+        self.assertEqual([book['title'] for book in response.data['results']], ['Book 4', 'Book 5'])
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(self.client.get('/api/books/?page=3&page_size=4').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_mode(self):
+        response = self.client.get('/api/books/?cursor=&page_size=4&ordering=-publication_year')
+        self.assertNotIn('count', response.data)
+        self.assertEqual([book['title'] for book in response.data['results']], ['Book 5', 'Book 4', 'Book 3', 'Book 2'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([book['title'] for book in response.data['results']], ['Book 1', 'Book 0'])
+        self.assertIsNone(response.data['next'])
+
+    def test_large_counts_are_estimated(self):
+        from django.test import override_settings
+
+        with override_settings(API_PAGINATION={'EXACT_COUNT_LIMIT': 3}):
+            response = self.client.get('/api/authors/?page_size=2&depth=0')
+            self.assertEqual((response.data['count'], response.data['count_is_estimate']), (6, True))
+            # Cached until the next write: only the page and its books are queried
+            with self.assertNumQueries(2):
+                self.client.get('/api/authors/?page_size=2&depth=0')
+
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                Author.objects.create(name="Author 6")
+                Author.objects.create(name="Author 7")
+                # Statistics still say 6 rows, but pages past the estimate stay reachable
+                response = self.client.get('/api/authors/?page_size=2&page=4&depth=0')
+                self.assertEqual(response.data['count'], 6)
+                self.assertEqual([author['name'] for author in response.data['results']], ["Author 6", "Author 7"])
+                self.assertIsNone(response.data['next'])
@@ -4,10 +4,15 @@ from . import views
 urlpatterns = [
     # List and detail (read-only)
     path('books/', views.BookListView.as_view(), name='book-list'),
-    path('books/', views.BookDetailView.as_view(), name='book-detail'),
+    path('books/<int:pk>/', views.BookDetailView.as_view(), name='book-detail'),
     
     # Write operations with explicit paths 
     path('books/create/', views.BookCreateView.as_view(), name='book-create'),
-    path('books/update/', views.BookUpdateView.as_view(), name='book-update'),
-    path('books/delete/', views.BookDeleteView.as_view(), name='book-delete'),
+    path('books/import/', views.BookImportView.as_view(), name='book-import'),
+    path('books/<int:pk>/update/', views.BookUpdateView.as_view(), name='book-update'),
+    path('books/<int:pk>/delete/', views.BookDeleteView.as_view(), name='book-delete'),
+
+    # Authors with nested books (read-only)
+    path('authors/', views.AuthorListView.as_view(), name='author-list'),
+    path('authors/<int:pk>/', views.AuthorDetailView.as_view(), name='author-detail'),
 ]
\ No newline at end of file
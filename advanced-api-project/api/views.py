@@ -1,25 +1,34 @@
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import filters as drf_filters  
 from django_filters import rest_framework as filters  
-from .models import Book
-from .serializers import BookSerializer
+from .importer import IMPORT_FORMATS, BookImportError, detect_format, import_books
+from .models import Author, Book
+from .prefetch import PrefetchingViewMixin
+from .result_cache import CachedResultSetMixin
+from .search import TokenSearchFilter
+from .serializers import AuthorSerializer, BookSerializer
 
 # Supports filtering, searching, and ordering
-class BookListView(generics.ListAPIView):
+# Matching ids are cached per parameter set (see api.result_cache)
+class BookListView(CachedResultSetMixin, generics.ListAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     # Add filtering, searching, and ordering
     filter_backends = [
         filters.DjangoFilterBackend,        
-        drf_filters.SearchFilter,           
+        TokenSearchFilter,  # SearchFilter backed by the BookSearchToken index
         drf_filters.OrderingFilter
     ]
 
     # Fields you can filter by (exact match)
     filterset_fields = ['title', 'publication_year', 'author']
-    # Fields you can search in (text search)
+    # Fields you can search in (word-prefix search over api.search's token index)
     search_fields = ['title', 'author__name']
     
     # Fields you can order by
@@ -40,15 +49,70 @@ class BookCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
 
+# Import many books from an uploaded CSV/NDJSON file - only logged-in users
+# Pass the same `checkpoint` again to resume an import that failed part way
+class BookImportView(APIView):
+    parser_classes = [MultiPartParser]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'Upload a CSV or NDJSON file.'})
+        import_format = request.data.get('format') or detect_format(upload.name)
+        if import_format not in IMPORT_FORMATS:
+            raise ValidationError({'format': f'Use one of {", ".join(IMPORT_FORMATS)}.'})
+        try:
+            result = import_books(upload, import_format, checkpoint=request.data.get('checkpoint') or None)
+        except BookImportError as exc:
+            raise ValidationError({'file': str(exc)})
+        code = status.HTTP_201_CREATED if result.books_created else status.HTTP_200_OK
+        return Response(result.as_dict(), status=code)
+
+
 # Change a book - only logged-in users
+# POST is accepted too, since the action is already in the path
 class BookUpdateView(generics.UpdateAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
 
+    def post(self, request, *args, **kwargs):
+        return self.update(request, *args, **kwargs)
+
 
 # Remove a book - only logged-in users
+# POST is accepted too, since the action is already in the path
 class BookDeleteView(generics.DestroyAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        return self.destroy(request, *args, **kwargs)
+
+
+# List authors with their books - anyone can see
+# Books are prefetched in one query; ?depth=0 returns book ids only
+# ?ordering=-book_count lists the most prolific authors (index on the stored counter)
+class AuthorListView(PrefetchingViewMixin, generics.ListAPIView):
+    queryset = Author.objects.order_by('name')
+    serializer_class = AuthorSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    filter_backends = [drf_filters.OrderingFilter]
+    ordering_fields = ['name', 'book_count', 'latest_publication_year']
+    ordering = ['name']
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if list(queryset.query.order_by) == ['-book_count']:
+            # Tie-break on name so the whole ORDER BY comes from api_author_book_count_idx
+            queryset = queryset.order_by(*queryset.query.order_by, 'name')
+        return queryset
+
+
+# See one author with their books - anyone can see
+class AuthorDetailView(PrefetchingViewMixin, generics.RetrieveAPIView):
+    queryset = Author.objects.all()
+    serializer_class = AuthorSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
@@ -4,5 +4,6 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('', include('instrumentation.urls')),  # /metrics/ for Prometheus
     path('', include('relationship_app.urls')),
 ]
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+ASGI-native read endpoints for books.
+
+``AsyncBookReadView`` serves the same data as ``BookList`` and the
+``list``/``retrieve`` actions of ``BookViewSet`` without parking a threadpool
+worker for the whole request: rows are fetched with the async ORM
+(``async for`` / ``aget``), and serialization plus JSON rendering run in a
+worker thread so the event loop stays free. Filtering is delegated to the
+wrapped view's ``get_queryset`` so both paths return identical results, and
+the wrapped view's throttles run at the same points as on the sync path.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .pagination import BookPagination
+from .renderers import FastJSONRenderer
+from .serializers import get_field_plan
+from .throttling import get_store
+from .views import BookViewSet
+
+
+class AsyncBookReadView(View):
+    view_class = BookViewSet
+    pagination_class = BookPagination
+    renderer_class = FastJSONRenderer
+
+    async def get(self, request, pk=None):
+        authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        drf_request = Request(request, authenticators=authenticators)
+        view = self.view_class(
+            request=drf_request, args=(), kwargs={'pk': pk} if pk else {},
+            format_kwarg=None, action='list' if pk is None else 'retrieve',
+        )
+        try:
+            await self.throttle(view, drf_request, before_authentication=True)
+            # Token hits are served from the token cache; misses need the DB
+            user = await sync_to_async(lambda: drf_request.user)()
+            if not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            await self.throttle(view, drf_request, before_authentication=False)
+
+            queryset = view.get_queryset()
+            if pk is None:
+                data = await self.list(queryset, drf_request, view)
+            else:
+                data = await self.retrieve(queryset, pk, view)
+        except exceptions.APIException as exc:
+            response = await self.render(
+                {'detail': exc.detail}, exc.status_code, authenticators, drf_request
+            )
+            if getattr(exc, 'wait', None):
+                response['Retry-After'] = '%d' % exc.wait
+            return response
+        return await self.render(data, 200)
+
+    async def throttle(self, view, request, before_authentication):
+        if get_store().blocking:
+            await sync_to_async(view.run_throttles)(request, before_authentication)
+        else:
+            view.run_throttles(request, before_authentication)
+
+    async def list(self, queryset, request, view):
+        plan = get_field_plan(view.get_serializer_class())
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset.values(*plan.columns), request, view=view)
+
+        def serialize():
+            return paginator.get_paginated_response(plan.render_many(page)).data
+
+        return await sync_to_async(serialize, thread_sensitive=False)()
+
+    async def retrieve(self, queryset, pk, view):
+        try:
+            book = await queryset.aget(pk=pk)
+        except queryset.model.DoesNotExist:
+            raise exceptions.NotFound(f'No {queryset.model._meta.object_name} matches the given query.')
+        return await sync_to_async(lambda: view.get_serializer(book).data, thread_sensitive=False)()
+
+    async def render(self, data, status, authenticators=(), request=None):
+        content = await sync_to_async(self.renderer_class().render, thread_sensitive=False)(data)
+        response = HttpResponse(content, status=status, content_type='application/json')
+        if status == 401 and authenticators:
+            response['WWW-Authenticate'] = authenticators[0].authenticate_header(request)
+        return response
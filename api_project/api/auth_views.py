@@ -1,15 +1,21 @@
-from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from .hashing import authenticate, hash_metrics, hashing_pool
+from .serializers import PooledAuthTokenSerializer
+from .tokens import create_user_with_token, issue_token, rotate_token
+from .throttling import LoginThrottle, RegisterThrottle, ThrottleBeforeAuthenticationMixin
 
 
-class CustomAuthToken(APIView):
+class CustomAuthToken(ThrottleBeforeAuthenticationMixin, APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [LoginThrottle]
     
     def post(self, request, *args, **kwargs):
         username = request.data.get('username')
@@ -20,14 +26,14 @@ class CustomAuthToken(APIView):
                 'error': 'Please provide both username and password'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        user = authenticate(username=username, password=password)
+        user = authenticate(request, username=username, password=password)
         
         if not user:
             return Response({
                 'error': 'Invalid credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
         
-        token, created = Token.objects.get_or_create(user=user)
+        token = issue_token(user)
         
         return Response({
             'token': token.key,
@@ -37,8 +43,20 @@ class CustomAuthToken(APIView):
         })
 
 
+class ThrottledObtainAuthToken(ThrottleBeforeAuthenticationMixin, ObtainAuthToken):
+    throttle_classes = [LoginThrottle]
+    serializer_class = PooledAuthTokenSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'token': issue_token(serializer.validated_data['user']).key})
+
+
 @api_view(['POST'])
+@authentication_classes([])  # never reads request.user; skip the session/token lookup
 @permission_classes([AllowAny])
+@throttle_classes([RegisterThrottle])
 def register_user(request):
     username = request.data.get('username')
     password = request.data.get('password')
@@ -54,13 +72,13 @@ def register_user(request):
             'error': 'Username already exists'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    user = User.objects.create_user(
-        username=username,
-        password=password,
-        email=email
+    # Same as User.objects.create_user(), with the hash computed on the hashing pool
+    user = User(
+        username=User.normalize_username(username),
+        email=User.objects.normalize_email(email),
+        password=hashing_pool.run(make_password, password),
     )
-    
-    token, created = Token.objects.get_or_create(user=user)
+    token = create_user_with_token(user)
     
     return Response({
         'token': token.key,
@@ -73,8 +91,10 @@ def register_user(request):
 @api_view(['POST'])
 def logout_user(request):
     try:
-        # Delete the user's token to logout
-        request.user.auth_token.delete()
+        # Delete the user's token to logout; this also evicts it from the
+        # token authentication cache
+        token = request.auth if isinstance(request.auth, Token) else request.user.auth_token
+        token.delete()
         return Response({
             'message': 'Successfully logged out'
         }, status=status.HTTP_200_OK)
@@ -84,6 +104,15 @@ def logout_user(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+def rotate_user_token(request):
+    token = rotate_token(request.user)
+    return Response({
+        'token': token.key,
+        'message': 'Token rotated'
+    })
+
+
 @api_view(['GET'])
 def user_profile(request):
     user = request.user
@@ -96,4 +125,10 @@ def user_profile(request):
         'is_staff': user.is_staff,
         'is_superuser': user.is_superuser,
         'date_joined': user.date_joined
-    })
\ No newline at end of file
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def password_hash_metrics(request):
+    return Response(hash_metrics.snapshot())
@@ -0,0 +1,209 @@
+"""
+Token authentication backed by a two-tier cache.
+
+``CachedTokenAuthentication`` behaves like DRF's ``TokenAuthentication`` but
+remembers each successfully authenticated ``(user, token)`` pair so hot read
+endpoints skip the ``Token`` ⨝ ``User`` query:
+
+* tier 1 is a bounded, thread-safe in-process LRU;
+* tier 2 is an optional Django cache alias shared between workers.
+
+Tokens past ``API_TOKENS['TTL']`` are rejected (see ``api.tokens``). Both
+tiers expire entries after ``TTL`` seconds.
+
+Every entry records the revocation generation it was cached under, a
+counter kept in ``GENERATION_ALIAS`` and read once per request. When a
+token is deleted (``logout_user``, rotation, sweeps) or a user is saved
+(deactivated, demoted...), the receivers in ``api.models`` drop the entries
+this process knows about and, on commit, bump the generation. Every
+worker then stops trusting the entries it cached earlier and re-checks the
+database once per token. ``GENERATION_ALIAS`` must be shared between
+workers; ``manage.py check --deploy`` reports a per-process cache as
+``api.E003``.
+
+Configured through the ``API_TOKEN_CACHE`` setting::
+
+    API_TOKEN_CACHE = {
+        'TTL': 60,                      # seconds
+        'MAX_ENTRIES': 10000,           # in-process LRU size
+        'CACHE_ALIAS': None,            # e.g. 'default' to enable the shared tier
+        'GENERATION_ALIAS': 'default',  # shared revocation counter
+    }
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+DEFAULTS = {
+    'TTL': 60,
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': None,
+    'GENERATION_ALIAS': 'default',
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'API_TOKEN_CACHE', {})}
+
+
+class TokenLRU:
+    """
+    A bounded LRU mapping token keys to ``(user, token, generation)`` with
+    a TTL, indexed by user id so a user's entries drop without a scan.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, max_entries):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._user_keys.setdefault(value[0].pk, set()).add(key)
+            while len(self._entries) > max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1][0].pk
+        keys = self._user_keys[user_id]
+        keys.discard(key)
+        if not keys:
+            del self._user_keys[user_id]
+
+
+class TokenCache:
+    key_prefix = 'api:token:'
+    generation_key = 'api:token:generation'
+
+    def __init__(self):
+        self.local = TokenLRU()
+
+    def shared(self):
+        alias = get_config()['CACHE_ALIAS']
+        return caches[alias] if alias else None
+
+    def generations(self):
+        return caches[get_config()['GENERATION_ALIAS']]
+
+    def cache_key(self, key):
+        # Never put raw token keys into a shared cache
+        return self.key_prefix + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def generation(self):
+        cache = self.generations()
+        generation = cache.get(self.generation_key)
+        if generation is None:
+            # Start from the clock so a lost counter never reuses an old generation
+            cache.add(self.generation_key, time.time_ns(), timeout=None)
+            generation = cache.get(self.generation_key)
+        return generation
+
+    def bump(self):
+        cache = self.generations()
+        try:
+            cache.incr(self.generation_key)
+        except ValueError:
+            cache.add(self.generation_key, time.time_ns(), timeout=None)
+
+    def get(self, key, generation):
+        value = self.local.get(key)
+        if value is None:
+            shared = self.shared()
+            if shared is None:
+                return None
+            value = shared.get(self.cache_key(key))
+            if value is None:
+                return None
+            config = get_config()
+            self.local.set(key, value, config['TTL'], config['MAX_ENTRIES'])
+        user, token, cached_generation = value
+        if cached_generation != generation:
+            # Cached before a revocation somewhere
+            self.local.delete(key)
+            return None
+        # Hand out copies so request code cannot mutate the cached objects
+        return copy.copy(user), copy.copy(token)
+
+    def set(self, key, user, token, generation):
+        config = get_config()
+        value = (user, token, generation)
+        self.local.set(key, value, config['TTL'], config['MAX_ENTRIES'])
+        shared = self.shared()
+        if shared is not None:
+            shared.set(self.cache_key(key), value, timeout=config['TTL'])
+
+    def invalidate(self, key):
+        self.local.delete(key)
+        shared = self.shared()
+        if shared is not None:
+            shared.delete(self.cache_key(key))
+        transaction.on_commit(self.bump)
+
+    def invalidate_user(self, user_id, keys=()):
+        self.local.delete_user(user_id)
+        shared = self.shared()
+        if shared is not None and keys:
+            shared.delete_many([self.cache_key(key) for key in keys])
+        transaction.on_commit(self.bump)
+
+    def clear(self):
+        self.local.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    cache = token_cache
+
+    def authenticate_credentials(self, key):
+        from .tokens import is_expired
+        # Read before the database, so a revocation racing this request
+        # still retires what it caches
+        generation = self.cache.generation()
+        cached = self.cache.get(key, generation)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            self.cache.set(key, *cached, generation)
+        if is_expired(cached[1]):
+            raise AuthenticationFailed('Token has expired.')
+        return cached
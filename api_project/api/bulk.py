@@ -0,0 +1,188 @@
+"""
+Bulk writes behind ``BookViewSet.bulk``.
+
+All rows are validated up front with ``BookBulkSerializer(many=True)``. If any
+row is rejected nothing is written and a ``ValidationError`` carrying one
+error dict per input row (``{}`` for good rows) is raised. Otherwise rows are
+written in chunks of ``BATCH_SIZE`` with ``bulk_create``/``bulk_update``
+inside a single transaction, and the search index and ``AuthorStats`` are
+refreshed once per chunk rather than once per row. The books table version
+behind list ETags is bumped once per call.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .conditional import bump_table_version
+from .models import Book, suspend_book_receivers
+from .search import get_backend
+from .serializers import BookBulkSerializer
+from .stats import refresh_author_stats
+
+BATCH_SIZE = 1000
+
+# Fields replaced when a posted row matches an existing book by isbn
+UPSERT_FIELDS = ['title', 'author', 'publication_date', 'pages', 'updated_at']
+
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _expect_list(data):
+    if not isinstance(data, list):
+        raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+
+
+def _validate(data, partial=False):
+    _expect_list(data)
+    serializer = BookBulkSerializer(data=data, many=True, partial=partial)
+    if not serializer.is_valid():
+        raise ValidationError(serializer.errors)
+    return serializer.validated_data
+
+
+def _add_error(errors, index, field, message):
+    errors[index].setdefault(field, []).append(message)
+
+
+def _check_duplicate_isbns(rows, errors):
+    seen = {}
+    for index, row in enumerate(rows):
+        isbn = row.get('isbn')
+        if not isbn:
+            continue
+        if isbn in seen:
+            _add_error(errors, index, 'isbn', f'Duplicate isbn; already used by item {seen[isbn]}.')
+        else:
+            seen[isbn] = index
+
+
+def _raise_if_errors(errors):
+    if any(errors):
+        raise ValidationError(errors)
+
+
+def bulk_upsert_books(data):
+    """
+    Create books, updating any existing book with the same isbn instead.
+    Returns ``(created, updated)`` counts.
+    """
+    rows = _validate(data)
+    errors = [{} for _ in rows]
+    _check_duplicate_isbns(rows, errors)
+    _raise_if_errors(errors)
+
+    created = updated = 0
+    backend = get_backend()
+    with suspend_book_receivers(), transaction.atomic():
+        for chunk in _chunks(rows):
+            isbns = [row['isbn'] for row in chunk if row.get('isbn')]
+            previous = dict(Book.objects.filter(isbn__in=isbns).values_list('isbn', 'author'))
+            books = [Book(**row) for row in chunk]
+            Book.objects.bulk_create(
+                books,
+                update_conflicts=True,
+                unique_fields=['isbn'],
+                update_fields=UPSERT_FIELDS,
+            )
+            if any(book.pk is None for book in books):
+                # Backends that cannot return ids from an upsert
+                by_isbn = Book.objects.in_bulk(isbns, field_name='isbn')
+                for book in books:
+                    if book.pk is None and book.isbn in by_isbn:
+                        book.pk = by_isbn[book.isbn].pk
+            backend.index_many(book for book in books if book.pk is not None)
+            refresh_author_stats(set(previous.values()) | {book.author for book in books})
+            updated += len(previous)
+            created += len(chunk) - len(previous)
+        bump_table_version(Book)
+    return created, updated
+
+
+def bulk_update_books(data, partial=False):
+    """
+    Update existing books; every item must carry the ``id`` of its book.
+    Returns the number of books updated.
+    """
+    rows = _validate(data, partial=partial)
+    errors = [{} for _ in rows]
+
+    ids = []
+    seen = set()
+    for index, item in enumerate(data):
+        pk = item.get('id')
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            _add_error(errors, index, 'id', 'A valid integer is required.')
+            pk = None
+        elif pk in seen:
+            _add_error(errors, index, 'id', 'Duplicate id.')
+        seen.add(pk)
+        ids.append(pk)
+    _raise_if_errors(errors)
+
+    existing = set()
+    for chunk in _chunks(ids):
+        existing.update(Book.objects.filter(id__in=chunk).values_list('id', flat=True))
+    for index, pk in enumerate(ids):
+        if pk not in existing:
+            _add_error(errors, index, 'id', f'Book {pk} does not exist.')
+
+    _check_duplicate_isbns(rows, errors)
+    isbns = [row['isbn'] for row in rows if row.get('isbn')]
+    owners = {}
+    for chunk in _chunks(isbns):
+        owners.update(Book.objects.filter(isbn__in=chunk).values_list('isbn', 'id'))
+    for index, (pk, row) in enumerate(zip(ids, rows)):
+        owner = owners.get(row.get('isbn'))
+        if owner is not None and owner != pk:
+            _add_error(errors, index, 'isbn', 'book with this isbn already exists.')
+    _raise_if_errors(errors)
+
+    now = timezone.now()
+    backend = get_backend()
+    with suspend_book_receivers(), transaction.atomic():
+        for chunk in _chunks(list(zip(ids, rows))):
+            books = Book.objects.in_bulk([pk for pk, _ in chunk])
+            authors = {book.author for book in books.values()}
+            fields = {'updated_at'}
+            for pk, row in chunk:
+                book = books[pk]
+                for field, value in row.items():
+                    setattr(book, field, value)
+                book.updated_at = now
+                fields.update(row)
+            Book.objects.bulk_update(books.values(), sorted(fields))
+            backend.index_many(books.values())
+            refresh_author_stats(authors | {book.author for book in books.values()})
+        bump_table_version(Book)
+    return len(ids)
+
+
+def bulk_delete_books(data):
+    """
+    Delete books given a list of ids (or of objects with an ``id``).
+    Returns the number of books deleted.
+    """
+    _expect_list(data)
+    errors = [{} for _ in data]
+    ids = []
+    for index, item in enumerate(data):
+        pk = item.get('id') if isinstance(item, dict) else item
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            _add_error(errors, index, 'id', 'A valid integer is required.')
+        ids.append(pk)
+    _raise_if_errors(errors)
+
+    deleted = 0
+    backend = get_backend()
+    with suspend_book_receivers(), transaction.atomic():
+        for chunk in _chunks(ids):
+            books = Book.objects.filter(id__in=chunk)
+            authors = set(books.values_list('author', flat=True))
+            deleted += books.delete()[1].get(Book._meta.label, 0)
+            backend.remove(chunk)
+            refresh_author_stats(authors)
+        bump_table_version(Book)
+    return deleted
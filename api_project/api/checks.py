@@ -0,0 +1,50 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+# Backends whose contents other worker processes cannot see
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+@register(deploy=True)
+def check_throttle_store(app_configs, **kwargs):
+    from .throttling import get_config
+
+    config = get_config()
+    if config['STORE'] != 'cache':
+        return []
+    if isinstance(caches[config['CACHE_ALIAS']], PROCESS_LOCAL_CACHES):
+        return [Error(
+            "API_THROTTLE['CACHE_ALIAS'] names a per-process cache, so each worker would enforce its own limit.",
+            hint='Set REDIS_URL or point CACHE_ALIAS at a Redis or memcached cache.',
+            id='api.E001',
+        )]
+    return []
+
+
+@register(deploy=True)
+def check_token_map(app_configs, **kwargs):
+    from .tokens import get_config
+
+    if isinstance(caches[get_config()['CACHE_ALIAS']], PROCESS_LOCAL_CACHES):
+        return [Error(
+            "API_TOKENS['CACHE_ALIAS'] names a per-process cache, so logins could return keys deleted by other workers.",
+            hint='Set REDIS_URL or point CACHE_ALIAS at a Redis or memcached cache.',
+            id='api.E002',
+        )]
+    return []
+
+
+@register(deploy=True)
+def check_token_generation(app_configs, **kwargs):
+    from .authentication import get_config
+
+    if isinstance(caches[get_config()['GENERATION_ALIAS']], PROCESS_LOCAL_CACHES):
+        return [Error(
+            "API_TOKEN_CACHE['GENERATION_ALIAS'] names a per-process cache, so other workers keep "
+            "accepting revoked tokens until their cached entries expire.",
+            hint='Set REDIS_URL or point GENERATION_ALIAS at a Redis or memcached cache.',
+            id='api.E003',
+        )]
+    return []
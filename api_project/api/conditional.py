@@ -0,0 +1,98 @@
+"""
+Conditional GET support (``ETag`` / ``Last-Modified``) for book endpoints.
+
+Validators are computed with one small query before any row is serialized:
+
+* detail: the row's ``updated_at``, sent as ``ETag`` and ``Last-Modified``;
+* list: the table's write counter (``TableVersion``), combined with a hash
+  of the query parameters. Every save, delete and bulk write bumps it, so
+  the check is a primary-key lookup whatever the size of the result set.
+  Lists carry no ``Last-Modified``: a timestamp cannot tell that a row was
+  deleted, and ``If-Modified-Since`` would answer 304 with stale data.
+
+When the request's ``If-None-Match`` / ``If-Modified-Since`` match, a
+``304 Not Modified`` is returned and the serializer never runs.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8'))
+    return f'"{digest.hexdigest()}"'
+
+
+def table_version(model):
+    from .models import TableVersion
+
+    version = (
+        TableVersion.objects.filter(table=model._meta.db_table)
+        .values_list('version', flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def bump_table_version(model):
+    from .models import TableVersion
+
+    table = model._meta.db_table
+    with transaction.atomic():
+        if TableVersion.objects.filter(table=table).update(version=F('version') + 1):
+            return
+        try:
+            with transaction.atomic():
+                TableVersion.objects.create(table=table, version=1)
+        except IntegrityError:
+            # Another writer created the row first
+            TableVersion.objects.filter(table=table).update(version=F('version') + 1)
+
+
+class ConditionalGetMixin:
+    """
+    Adds ``ETag`` to ``list`` and ``ETag`` / ``Last-Modified`` to
+    ``retrieve``, and answers matching conditional requests with
+    ``304 Not Modified``.
+    """
+    last_modified_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        version = table_version(self.get_queryset().model)
+        params = sorted(request.query_params.lists())
+        etag = make_etag('list', request.accepted_media_type, params, version)
+        return self.conditional(request, etag, None, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            last_modified = (
+                self.filter_queryset(self.get_queryset())
+                .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .values_list(self.last_modified_field, flat=True)
+                .first()
+            )
+        except (ValueError, TypeError, ValidationError):
+            # Malformed lookup value
+            last_modified = None
+        if last_modified is None:
+            # Missing row: let get_object() produce the usual 404
+            return super().retrieve(request, *args, **kwargs)
+        etag = make_etag('detail', request.accepted_media_type, kwargs[lookup_url_kwarg], last_modified)
+        return self.conditional(request, etag, last_modified, super().retrieve, *args, **kwargs)
+
+    def conditional(self, request, etag, last_modified, handler, *args, **kwargs):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,217 @@
+"""
+Password hashing on a bounded worker pool.
+
+PBKDF2 is deliberately slow, so a burst of logins or registrations can pin
+every request worker and leave reads queued behind them. Hashes requested
+through ``hashing_pool.run`` instead execute on a small thread pool
+(``hashlib`` releases the GIL while hashing). At most ``WORKERS +
+QUEUE_DEPTH`` hashes are in flight at a time, and anything beyond that fails
+fast with ``503 Service Unavailable`` instead of waiting. Keep that sum well
+below the server's request thread count, since each waiting hash also holds a
+request thread.
+
+Configured through the ``API_PASSWORD_HASHING`` setting::
+
+    API_PASSWORD_HASHING = {
+        'WORKERS': 2,       # hashing threads per process; 0 hashes inline
+        'QUEUE_DEPTH': 2,   # hashes allowed to wait for a free thread
+        'TIMEOUT': 5,       # seconds a request waits for its hash
+    }
+
+``authenticate()`` here checks passwords through ``PooledHashingBackend`` and
+is meant for the DRF login views only: ``HashingUnavailable`` is a DRF
+exception, so Django admin and ``api-auth/`` session logins stay on
+``ModelBackend`` (``AUTHENTICATION_BACKENDS``) and hash on the request
+thread. ``hash_metrics`` keeps latency and rejection counts, which staff can read
+from ``/api/auth/hash-metrics/``.
+"""
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_login_failed
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'QUEUE_DEPTH': 2,
+    'TIMEOUT': 5,
+}
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'API_PASSWORD_HASHING', {})}
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, please retry shortly.'
+    default_code = 'hashing_unavailable'
+    # Picked up by DRF's exception handler as the Retry-After header
+    wait = 1
+
+
+class HashMetrics:
+    """Latency histogram and counters for pooled password hashing."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._zero()
+
+    def reset(self):
+        with self._lock:
+            self._zero()
+
+    def _zero(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.queue_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rejected = 0
+        self.timed_out = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds, queue_seconds):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.queue_seconds += queue_seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def time_out(self):
+        with self._lock:
+            self.timed_out += 1
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, total = {}, 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), self.buckets):
+                total += count
+                cumulative[str(bound)] = total
+            return {
+                'count': self.count,
+                'seconds_sum': self.seconds,
+                'seconds_max': self.max_seconds,
+                'queue_seconds_sum': self.queue_seconds,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'buckets': cumulative,
+            }
+
+
+hash_metrics = HashMetrics()
+
+
+class HashingPool:
+    metrics = hash_metrics
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                config = get_config()
+                self._slots = threading.BoundedSemaphore(config['WORKERS'] + config['QUEUE_DEPTH'])
+                self._executor = ThreadPoolExecutor(config['WORKERS'], thread_name_prefix='password-hash')
+        return self._executor
+
+    def run(self, func, *args):
+        """
+        Call ``func(*args)`` on the pool and return its result. Raises
+        ``HashingUnavailable`` when the pool is saturated or the call does
+        not finish within ``TIMEOUT``.
+        """
+        config = get_config()
+        if not config['WORKERS']:
+            return self.timed(func, args, time.perf_counter())
+        executor = self._executor or self.start()
+        if not self._slots.acquire(blocking=False):
+            self.metrics.reject()
+            raise HashingUnavailable()
+        try:
+            future = executor.submit(self.timed, func, args, time.perf_counter(), release=True)
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            return future.result(timeout=config['TIMEOUT'])
+        except TimeoutError:
+            # The hash still finishes in the background and frees its slot
+            self.metrics.time_out()
+            raise HashingUnavailable()
+
+    def timed(self, func, args, queued, release=False):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.metrics.observe(time.perf_counter() - started, started - queued)
+            if release:
+                self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = self._slots = None
+
+
+hashing_pool = HashingPool()
+
+
+class PooledHashingBackend(ModelBackend):
+    """
+    ``ModelBackend`` that checks passwords on ``hashing_pool``. The user row
+    is still read (and an outdated hash re-saved) on the request thread, so
+    database access stays on the request's connection.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords
+            hashing_pool.run(make_password, password)
+            return None
+        is_correct, must_update = hashing_pool.run(verify_password, password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = hashing_pool.run(make_password, password)
+            user.save(update_fields=['password'])
+        return user
+
+
+def authenticate(request=None, username=None, password=None):
+    """
+    Like ``django.contrib.auth.authenticate`` but always through
+    ``PooledHashingBackend``. Raises ``HashingUnavailable`` when the pool is
+    saturated, so only call it where DRF handles the exception. Sends
+    ``user_login_failed`` on failure, as Django's does.
+    """
+    user = PooledHashingBackend().authenticate(request, username=username, password=password)
+    if user is None:
+        # Same masking as django.contrib.auth.authenticate
+        credentials = {'username': username, 'password': '*' * 20}
+        user_login_failed.send(sender=__name__, credentials=credentials, request=request)
+    return user
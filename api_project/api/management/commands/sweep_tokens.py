@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.tokens import get_config, sweep_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete API tokens older than API_TOKENS['TTL']."
+
+    def handle(self, *args, **options):
+        if not get_config()['TTL']:
+            self.stdout.write("API_TOKENS['TTL'] is not set; tokens never expire.")
+            return
+        deleted = sweep_expired_tokens()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired token(s).'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.3 on 2026-10-18 03:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def search_backend(apps, schema_editor):
+    from api.search import get_backend
+
+    return get_backend(schema_editor.connection, apps.get_model('api', 'BookTrigram'))
+
+
+def build_search_index(apps, schema_editor):
+    from api.search import rebuild_index
+
+    backend = search_backend(apps, schema_editor)
+    with schema_editor.connection.cursor() as cursor:
+        backend.install(cursor)
+    rebuild_index(apps.get_model('api', 'Book').objects.all(), backend=backend)
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        search_backend(apps, schema_editor).uninstall(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_book_title_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=10)),
+                ('gram', models.CharField(max_length=3)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='api.book')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['field', 'gram', 'book'], name='api_booktrigram_lookup_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:00
+
+from django.db import migrations, models
+
+
+def build_author_stats(apps, schema_editor):
+    from api.stats import rebuild_author_stats
+
+    rebuild_author_stats(apps.get_model('api', 'AuthorStats'), apps.get_model('api', 'Book'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_book_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.CharField(max_length=100, unique=True)),
+                ('book_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Author stats',
+                'ordering': ['author'],
+            },
+        ),
+        migrations.RunPython(build_author_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_author_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['updated_at'], name='api_book_updated_at_idx'),
+        ),
+    ]
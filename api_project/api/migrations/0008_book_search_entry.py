@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:19
+
+import api.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_table_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchEntry',
+            fields=[
+                ('book', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='api.book')),
+                ('document', api.models.FTSColumn(db_column='api_book_search')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'api_book_search',
+                'managed': False,
+            },
+        ),
+    ]
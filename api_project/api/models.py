@@ -1,4 +1,11 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
 
 class Book(models.Model):
     title = models.CharField(max_length=200, help_text="The title of the book")
@@ -13,6 +20,179 @@ class Book(models.Model):
         ordering = ['title']
         verbose_name = 'Book'
         verbose_name_plural = 'Books'
+        indexes = [
+            # Backs keyset pagination on (title, id)
+            models.Index(fields=['title', 'id'], name='api_book_title_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} by {self.author}"
+
+
+class BookTrigram(models.Model):
+    # One row per distinct trigram of a book's normalized title or author.
+    # Backs substring search on databases without FTS5 (see api.search).
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='trigrams')
+    field = models.CharField(max_length=10)
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['field', 'gram', 'book'], name='api_booktrigram_lookup_idx'),
+        ]
+
+
+class MatchLookup(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class FTSColumn(models.TextField):
+    pass
+
+
+FTSColumn.register_lookup(MatchLookup)
+
+
+class BookSearchEntry(models.Model):
+    # Read-only view of the FTS5 table created by api.search.FTS5SearchBackend,
+    # so searches join it through the ORM. ``document`` is FTS5's hidden column
+    # named after the table (it takes MATCH queries) and ``rank`` its hidden
+    # bm25() column.
+    book = models.OneToOneField(
+        Book, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_entry',
+    )
+    document = FTSColumn(db_column='api_book_search')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'api_book_search'
+
+
+class AuthorStats(models.Model):
+    # Materialized per-author book counts read by BookViewSet.admin_stats
+    # (see api.stats). Maintained by the Book signal receivers below.
+    author = models.CharField(max_length=100, unique=True)
+    book_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['author']
+        verbose_name_plural = 'Author stats'
+
+    def __str__(self):
+        return f"{self.author}: {self.book_count}"
+
+
+class TableVersion(models.Model):
+    # Write counter per table, the validator behind list ETags (see
+    # api.conditional). Bumped by the Book signal receivers below and by the
+    # bulk writers in api.bulk.
+    table = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
 
     def __str__(self):
-        return f"{self.title} by {self.author}"
\ No newline at end of file
+        return f"{self.table}: {self.version}"
+
+
+_receiver_state = threading.local()
+
+
+@contextmanager
+def suspend_book_receivers():
+    """
+    Skip the per-row search index and stats receivers below. Bulk writers
+    use this and refresh the derived tables once per batch instead.
+    """
+    _receiver_state.suspended = True
+    try:
+        yield
+    finally:
+        _receiver_state.suspended = False
+
+
+def book_receivers_suspended():
+    return getattr(_receiver_state, 'suspended', False)
+
+
+# Keep the search index in step with the books table
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, raw=False, **kwargs):
+    if raw or book_receivers_suspended():
+        return
+    from .search import get_backend
+    get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, **kwargs):
+    if book_receivers_suspended():
+        return
+    from .search import get_backend
+    get_backend().remove([instance.pk])
+
+
+# Keep the per-author counters in step with the books table
+@receiver(pre_save, sender=Book)
+def remember_previous_author(sender, instance, raw=False, **kwargs):
+    instance._previous_author = None
+    if instance.pk and not raw and not book_receivers_suspended():
+        instance._previous_author = (
+            Book.objects.filter(pk=instance.pk).values_list('author', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Book)
+def count_book(sender, instance, created, raw=False, **kwargs):
+    if raw or book_receivers_suspended():
+        return
+    from .stats import adjust_author_count
+    previous = getattr(instance, '_previous_author', None)
+    if previous == instance.author:
+        return
+    if previous is not None:
+        adjust_author_count(previous, -1)
+    adjust_author_count(instance.author, 1)
+
+
+@receiver(post_delete, sender=Book)
+def uncount_book(sender, instance, **kwargs):
+    if book_receivers_suspended():
+        return
+    from .stats import adjust_author_count
+    adjust_author_count(instance.author, -1)
+
+
+# Retire list ETags whenever the books table changes
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def bump_book_version(sender, **kwargs):
+    if book_receivers_suspended():
+        return
+    from .conditional import bump_table_version
+    bump_table_version(Book)
+
+
+# Drop cached token authentications (see api.authentication)
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    from .authentication import token_cache
+    from .tokens import user_tokens
+    token_cache.invalidate(instance.key)
+    user_tokens.delete(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_user_tokens(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    from .authentication import token_cache
+    from .tokens import user_tokens
+    keys = Token.objects.filter(user_id=instance.pk).values_list('key', flat=True)
+    token_cache.invalidate_user(instance.pk, keys)
+    user_tokens.delete(instance.pk)
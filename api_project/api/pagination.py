@@ -0,0 +1,191 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination ordered on ``(title, id)``.
+
+    Each page is fetched with ``WHERE (title, id) > (:title, :id) LIMIT n + 1``
+    so it can be served straight from the ``(title, id)`` index: deep pages cost
+    the same as the first one and no ``COUNT(*)`` query is issued.
+
+    Cursors are opaque tokens encoding the boundary row and the direction of
+    travel. Pass an empty ``?cursor=`` to request the first page.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('title', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.get_page_queryset(queryset, request)))
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Return the unevaluated slice for the requested page. Split from
+        ``finish_page`` so async callers can evaluate it with ``async for``.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        field, tiebreaker = self.ordering
+        if self.reverse:
+            queryset = queryset.order_by('-' + field, '-' + tiebreaker)
+        else:
+            queryset = queryset.order_by(field, tiebreaker)
+
+        if self.position is not None:
+            value, pk = self.position
+            lookup = 'lt' if self.reverse else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value}) |
+                Q(**{field: value, f'{tiebreaker}__{lookup}': pk})
+            )
+
+        # Fetch one extra row to find out whether another page follows.
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        if results:
+            self.next_position = self.get_position(results[-1])
+            self.previous_position = self.get_position(results[0])
+        else:
+            self.next_position = self.previous_position = None
+
+        if self.reverse:
+            self.has_next = self.position is not None and bool(results)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None and bool(results)
+
+        return results
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_query_param)
+        if page_size:
+            try:
+                page_size = int(page_size)
+            except ValueError:
+                return self.page_size
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        return self.page_size
+
+    def get_position(self, row):
+        field, tiebreaker = self.ordering
+        if isinstance(row, dict):
+            return row[field], row[tiebreaker]
+        return getattr(row, field), getattr(row, tiebreaker)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position = (str(payload['p'][0]), int(payload['p'][1]))
+            reverse = bool(payload.get('r', False))
+        except (TypeError, ValueError, KeyError, IndexError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse=False):
+        payload = {'p': list(position)}
+        if reverse:
+            payload['r'] = True
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class BookPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset mode when the request
+    carries a ``cursor`` query parameter (``?cursor=`` for the first page).
+    """
+    keyset_class = KeysetPagination
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async counterpart of ``paginate_queryset`` using the async ORM."""
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            page = self.keyset.get_page_queryset(queryset, request)
+            return self.keyset.finish_page([row async for row in page])
+        self.keyset = None
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
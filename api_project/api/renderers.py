@@ -0,0 +1,40 @@
+"""
+JSON renderer backed by ``orjson`` when it is installed. The matching
+parser is ``api.parsers.FastJSONParser``.
+
+Both fall back to DRF's stdlib implementations when ``orjson`` is missing or
+when a request needs something it cannot reproduce byte-for-byte (indented
+output, ``ensure_ascii``, non-strict NaN handling, non-UTF-8 bodies, integers
+wider than 64 bits). ``date``/``datetime``/``UUID`` values are encoded by
+``orjson`` itself; anything else (``Decimal``, lazy strings, ``timedelta``...)
+goes through DRF's encoder, so the output matches ``JSONRenderer``.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict-javascript-subset escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
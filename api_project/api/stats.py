@@ -0,0 +1,75 @@
+"""
+Incrementally maintained catalog statistics.
+
+``AuthorStats`` holds one row per distinct ``Book.author`` with its book
+count, so ``BookViewSet.admin_stats`` can answer from that small table
+instead of scanning ``api_book``. Single-row writes adjust the counters in
+place through the ``Book`` signal receivers; bulk writes that bypass signals
+call ``refresh_author_stats`` for the authors they touched. Authors whose
+last book goes keep a row at 0 until the next refresh, so readers filter
+on ``book_count__gt=0``.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+
+def adjust_author_count(author, delta):
+    from .models import AuthorStats
+
+    if delta < 0:
+        # Clamped, so a counter that drifted to 0 cannot fail the unsigned
+        # column; rows left at 0 are skipped by the readers
+        AuthorStats.objects.filter(author=author).update(
+            book_count=Greatest(F('book_count') + delta, 0)
+        )
+        return
+    updated = AuthorStats.objects.filter(author=author).update(
+        book_count=F('book_count') + delta
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                AuthorStats.objects.create(author=author, book_count=delta)
+        except IntegrityError:
+            # Another writer created the row first
+            AuthorStats.objects.filter(author=author).update(
+                book_count=F('book_count') + delta
+            )
+
+
+def refresh_author_stats(authors):
+    """Recompute the counters for ``authors`` from the books table."""
+    from .models import AuthorStats, Book
+
+    authors = set(authors)
+    if not authors:
+        return
+    counts = dict(
+        Book.objects.filter(author__in=authors)
+        .values_list('author')
+        .annotate(book_count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        AuthorStats.objects.filter(author__in=authors - counts.keys()).delete()
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(author=author, book_count=count) for author, count in counts.items()],
+            update_conflicts=True,
+            unique_fields=['author'],
+            update_fields=['book_count'],
+        )
+
+
+def rebuild_author_stats(stats_model, book_model):
+    """Rebuild the whole table; used by the migration that introduces it."""
+    stats_model.objects.all().delete()
+    stats_model.objects.bulk_create(
+        [
+            stats_model(author=author, book_count=count)
+            for author, count in book_model.objects.values_list('author')
+            .annotate(book_count=Count('id'))
+            .order_by()
+        ],
+        batch_size=1000,
+    )
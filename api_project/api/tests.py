@@ -1,3 +1,806 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from .models import Book
+from .serializers import BookSerializer
 
-# Create your tests here.
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        # Duplicate titles make sure the id tiebreaker is honoured
+        for i in range(5):
+            Book.objects.create(title='Dune', author='Frank Herbert', isbn=f'dune{i}')
+        for title in ['Animal Farm', 'Brave New World', 'Emma', 'Persuasion']:
+            Book.objects.create(title=title, author='Various')
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(book['id'] for book in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walks_every_row_in_title_id_order(self):
+        expected = list(Book.objects.order_by('title', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/books_all/?cursor=&page_size=2'), expected)
+        self.assertEqual(self.walk('/api/books/?cursor=&page_size=3'), expected)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get('/api/books_all/?cursor=&page_size=3')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_filters_apply_in_keyset_mode(self):
+        response = self.client.get('/api/books_all/?cursor=&author=herbert&page_size=10')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get('/api/books_all/')
+        self.assertEqual(response.data['count'], 9)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/books_all/?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookSearchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.dune = Book.objects.create(title='Dune', author='Frank Herbert')
+        self.messiah = Book.objects.create(title='Dune Messiah', author='Frank Herbert')
+        self.emma = Book.objects.create(title='Emma', author='Jane Austen')
+        self.garcia = Book.objects.create(title='Cien años de soledad', author='Gabriel García Márquez')
+
+    def titles(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book['title'] for book in response.data['results']]
+
+    def test_substring_match_is_ranked(self):
+        self.assertEqual(self.titles('/api/books_all/?title=dune'), ['Dune', 'Dune Messiah'])
+        self.assertEqual(self.titles('/api/books/?title=MESSIAH'), ['Dune Messiah'])
+
+    def test_author_and_title_combine(self):
+        self.assertEqual(self.titles('/api/books_all/?author=herbert&title=messiah'), ['Dune Messiah'])
+        self.assertEqual(self.titles('/api/books_all/?author=austen&title=dune'), [])
+
+    def test_matching_ignores_case_and_diacritics(self):
+        self.assertEqual(self.titles('/api/books_all/?author=garcia'), ['Cien años de soledad'])
+        self.assertEqual(self.titles('/api/books_all/?title=AÑOS'), ['Cien años de soledad'])
+
+    def test_short_queries_fall_back_to_icontains(self):
+        self.assertEqual(self.titles('/api/books_all/?title=UN'), ['Dune', 'Dune Messiah'])
+
+    def test_index_follows_save_and_delete(self):
+        self.emma.title = 'Persuasion'
+        self.emma.save()
+        self.assertEqual(self.titles('/api/books_all/?title=emma'), [])
+        self.assertEqual(self.titles('/api/books_all/?title=persuasion'), ['Persuasion'])
+        self.emma.delete()
+        self.assertEqual(self.titles('/api/books_all/?title=persuasion'), [])
+
+    def test_trigram_backend(self):
+        from .search import TrigramSearchBackend
+
+        backend = TrigramSearchBackend()
+        backend.index_many(Book.objects.all())
+        results = backend.filter(Book.objects.all(), {'title': 'dune'}).order_by('search_rank')
+        self.assertEqual([book.title for book in results], ['Dune', 'Dune Messiah'])
+        self.assertFalse(backend.filter(Book.objects.all(), {'title': 'une mes dune'}).exists())
+
+
+class AdminStatsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='testpass', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.emma = Book.objects.create(title='Emma', author='Jane Austen')
+        Book.objects.create(title='Persuasion', author='Jane Austen')
+        Book.objects.create(title='Dune', author='Frank Herbert')
+
+    def get_stats(self):
+        response = self.client.get('/api/books_all/admin_stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_counts_follow_writes(self):
+        data = self.get_stats()
+        self.assertEqual(data['total_books'], 3)
+        self.assertEqual(data['total_authors'], 2)
+        self.assertEqual(data['authors'], [
+            {'author': 'Frank Herbert', 'book_count': 1},
+            {'author': 'Jane Austen', 'book_count': 2},
+        ])
+
+        self.emma.author = 'Frank Herbert'
+        self.emma.save()
+        Book.objects.get(title='Persuasion').delete()
+        data = self.get_stats()
+        self.assertEqual(data['total_books'], 2)
+        self.assertEqual(data['authors'], [{'author': 'Frank Herbert', 'book_count': 2}])
+
+    def test_does_not_scan_books(self):
+        with self.assertNumQueries(3):  # sum, page count, page rows
+            self.get_stats()
+
+    def test_drifted_counter_clamps_at_zero(self):
+        from .models import AuthorStats
+
+        AuthorStats.objects.filter(author='Frank Herbert').update(book_count=0)
+        Book.objects.get(title='Dune').delete()
+        self.assertEqual(AuthorStats.objects.get(author='Frank Herbert').book_count, 0)
+        self.assertEqual(self.get_stats()['total_authors'], 1)
+
+    def test_refresh_repairs_counters(self):
+        from .models import AuthorStats
+        from .stats import refresh_author_stats
+
+        AuthorStats.objects.all().delete()
+        refresh_author_stats(['Jane Austen', 'Nobody'])
+        self.assertEqual(
+            list(AuthorStats.objects.values_list('author', 'book_count')),
+            [('Jane Austen', 2)],
+        )
+
+
+class BulkBookTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='testpass', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.emma = Book.objects.create(title='Emma', author='Jane Austen', isbn='1111111111')
+
+    def test_create_with_isbn_upsert(self):
+        rows = [
+            {'title': 'Dune', 'author': 'Frank Herbert', 'isbn': '2222222222'},
+            {'title': 'Emma (Annotated)', 'author': 'Jane Austen', 'isbn': '1111111111'},
+        ]
+        response = self.client.post('/api/books_all/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.emma.refresh_from_db()
+        self.assertEqual(self.emma.title, 'Emma (Annotated)')
+        self.assertEqual(Book.objects.count(), 2)
+        # Derived tables are refreshed for the batch
+        titles = self.client.get('/api/books_all/?title=dune').data['results']
+        self.assertEqual([book['title'] for book in titles], ['Dune'])
+        stats = self.client.get('/api/books_all/admin_stats/').data
+        self.assertEqual(stats['total_books'], 2)
+
+    def test_ndjson_body(self):
+        body = '{"title": "Dune", "author": "Frank Herbert"}\n\n{"title": "Emma", "author": "Jane Austen"}\n'
+        response = self.client.post('/api/books_all/bulk/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.data['created'], 2)
+
+    def test_invalid_rows_write_nothing(self):
+        rows = [
+            {'title': 'Dune', 'author': 'Frank Herbert', 'isbn': '2222222222'},
+            {'author': 'No Title'},
+            {'title': 'Dune again', 'author': 'Frank Herbert', 'isbn': '2222222222'},
+        ]
+        response = self.client.post('/api/books_all/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('title', response.data[1])
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_update_and_delete(self):
+        dune = Book.objects.create(title='Dune', author='Frank Herbert', isbn='2222222222')
+        rows = [{'id': self.emma.id, 'pages': 474}, {'id': dune.id, 'isbn': '1111111111'}]
+        response = self.client.patch('/api/books_all/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('isbn', response.data[1])
+
+        response = self.client.patch('/api/books_all/bulk/', rows[:1], format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.emma.refresh_from_db()
+        self.assertEqual((self.emma.pages, self.emma.title), (474, 'Emma'))
+
+        response = self.client.delete('/api/books_all/bulk/', [self.emma.id, {'id': dune.id}], format='json')
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertFalse(Book.objects.exists())
+        self.assertEqual(self.client.get('/api/books_all/admin_stats/').data['total_authors'], 0)
+
+    def test_requires_staff(self):
+        reader = User.objects.create_user(username='reader', password='testpass')
+        self.client.force_authenticate(user=reader)
+        response = self.client.post('/api/books_all/bulk/', [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        Book.objects.create(title='Dune', author='Frank Herbert', pages=412)
+        Book.objects.create(title='Emma', author='Jane Austen', isbn='1111111111')
+
+    def test_ndjson_matches_serializer_output(self):
+        import json
+
+        response = self.client.get('/api/books_all/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        expected = [dict(row) for row in BookSerializer(Book.objects.order_by('title'), many=True).data]
+        self.assertEqual(rows, expected)
+
+    def test_csv_honours_filters(self):
+        response = self.client.get('/api/books_all/export/?output=csv&author=austen')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('id,title,author'))
+        self.assertIn('Emma,Jane Austen', lines[1])
+
+    def test_unknown_format(self):
+        response = self.client.get('/api/books_all/export/?output=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.dune = Book.objects.create(title='Dune', author='Frank Herbert')
+        self.emma = Book.objects.create(title='Emma', author='Jane Austen')
+
+    def test_detail_not_modified_until_row_changes(self):
+        url = f'/api/books_all/{self.dune.id}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        self.dune.pages = 412
+        self.dune.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_tracks_filters_and_deletes(self):
+        etag = self.client.get('/api/books_all/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/books_all/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.assertNotEqual(self.client.get('/api/books_all/?title=dune')['ETag'], etag)
+
+        self.emma.delete()
+        response = self.client.get('/api/books_all/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_validator_ignores_result_size_and_tracks_bulk_writes(self):
+        from .bulk import bulk_delete_books
+
+        response = self.client.get('/api/books_all/')
+        # A timestamp cannot reflect deletions, so lists carry only the ETag
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+
+        bulk_delete_books([self.emma.id])
+        response = self.client.get('/api/books_all/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_missing_book_is_404(self):
+        response = self.client.get('/api/books_all/999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/api/books_all/abc/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        from rest_framework.authtoken.models import Token
+        from .authentication import token_cache
+
+        cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_auth_query(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').data['username'], 'reader')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_logout_evicts_token(self):
+        self.client.get('/api/auth/profile/')
+        response = self.client.post('/api/auth/logout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_changes_evict_entries(self):
+        self.client.get('/api/auth/profile/')
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_shared_tier(self):
+        from .authentication import token_cache
+
+        with self.settings(API_TOKEN_CACHE={'CACHE_ALIAS': 'default'}):
+            self.client.get('/api/auth/profile/')
+            token_cache.local.clear()
+            with self.assertNumQueries(0):
+                self.client.get('/api/auth/profile/')
+            self.token.delete()
+            token_cache.local.clear()
+            response = self.client.get('/api/auth/profile/')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_retires_other_workers_entries(self):
+        from unittest import mock
+        from .authentication import token_cache
+
+        self.client.get('/api/auth/profile/')
+        # Leave the local entry in place, as another worker's would be
+        with mock.patch.object(token_cache.local, 'delete'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_lru_is_bounded_and_expires(self):
+        from .authentication import TokenLRU
+
+        lru = TokenLRU()
+        for key in 'abc':
+            lru.set(key, (self.user, self.token, 0), ttl=60, max_entries=2)
+        self.assertIsNone(lru.get('a'))
+        self.assertIsNotNone(lru.get('c'))
+        lru.set('d', (self.user, self.token, 0), ttl=0, max_entries=2)
+        self.assertIsNone(lru.get('d'))
+        lru.delete_user(self.user.pk)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru._user_keys, {})
+
+
+class AsyncReadPathTestCase(TestCase):
+    def setUp(self):
+        from rest_framework.authtoken.models import Token
+
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        for title in ['Dune', 'Dune Messiah', 'Emma']:
+            Book.objects.create(title=title, author='Various')
+
+    def test_matches_sync_endpoints(self):
+        for sync_url, async_url in [
+            ('/api/books_all/?page_size=2', '/api/async/books_all/?page_size=2'),
+            ('/api/books_all/?title=dune', '/api/async/books_all/?title=dune'),
+            ('/api/books/?cursor=&page_size=2', '/api/async/books/?cursor=&page_size=2'),
+        ]:
+            expected = self.client.get(sync_url).json()
+            response = self.client.get(async_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            actual = response.json()
+            for key in ('next', 'previous'):
+                if expected.get(key):
+                    expected[key] = expected[key].replace('/api/', '/api/async/')
+            self.assertEqual(actual, expected)
+
+    def test_retrieve(self):
+        book = Book.objects.get(title='Emma')
+        response = self.client.get(f'/api/async/books_all/{book.id}/')
+        self.assertEqual(response.json(), self.client.get(f'/api/books_all/{book.id}/').json())
+        response = self.client.get('/api/async/books_all/999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/api/async/books_all/?page=2')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        response = self.client.get('/api/async/books_all/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+        response = self.client.get('/api/async/books_all/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class FastJSONTestCase(TestCase):
+    def sample(self):
+        import datetime
+        import decimal
+
+        Book.objects.create(title='Emma ', author='Jane Austen', pages=474,
+                            publication_date=datetime.date(1815, 12, 23))
+        return {
+            'books': BookSerializer(Book.objects.all(), many=True).data,
+            'price': decimal.Decimal('9.99'),
+            'when': datetime.datetime(2024, 1, 2, 3, 4, 5, 6789, tzinfo=datetime.timezone.utc),
+            'naïve': 'ünïcode',
+            7: 'int key',
+        }
+
+    def test_matches_stock_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+
+        data = self.sample()
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        indented = 'application/json; indent=4'
+        self.assertEqual(FastJSONRenderer().render(data, indented), JSONRenderer().render(data, indented))
+
+    def test_falls_back_without_orjson(self):
+        from unittest import mock
+        from rest_framework.renderers import JSONRenderer
+        from . import renderers
+
+        data = self.sample()
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_parser(self):
+        import io
+        from rest_framework.exceptions import ParseError
+        from .parsers import FastJSONParser
+
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"a": ["ü", 1.5]}'.encode())), {'a': ['ü', 1.5]})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"a": NaN}'))
+
+
+class FieldPlanTestCase(TestCase):
+    def setUp(self):
+        import datetime
+
+        cache.clear()
+        Book.objects.create(title='Emma', author='Jane Austen', pages=474, isbn='1111111111',
+                            publication_date=datetime.date(1815, 12, 23))
+        Book.objects.create(title='Dune', author='Frank Herbert')
+
+    def test_output_is_byte_identical(self):
+        from rest_framework.renderers import JSONRenderer
+        from .serializers import BookDetailSerializer, get_field_plan
+
+        for serializer_class in (BookSerializer, BookDetailSerializer):
+            plan = get_field_plan(serializer_class)
+            fast = plan.render_many(Book.objects.values(*plan.columns))
+            stock = serializer_class(Book.objects.all(), many=True).data
+            self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(stock))
+
+    def test_datetimes_follow_active_timezone(self):
+        from django.utils import timezone
+        from .serializers import BookDetailSerializer, get_field_plan
+
+        plan = get_field_plan(BookDetailSerializer)
+        with timezone.override('Asia/Kolkata'):
+            fast = plan.render_many(Book.objects.order_by('id').values(*plan.columns))
+            stock = BookDetailSerializer(Book.objects.order_by('id'), many=True).data
+        self.assertEqual(fast, stock)
+        self.assertTrue(fast[0]['updated_at'].endswith('+05:30'))
+
+    def test_list_endpoint_uses_values_rows(self):
+        user = User.objects.create_user(username='reader', password='testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/api/books_all/')
+        expected = BookSerializer(Book.objects.order_by('title'), many=True).data
+        self.assertEqual(response.data['results'], expected)
+
+
+class ThrottlingTestCase(TestCase):
+    def setUp(self):
+        from unittest import mock
+        from rest_framework.authtoken.models import Token
+        from .throttling import TokenBucketThrottle
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        rates = {'address': '100/min', 'token': '2/min', 'user': '100/min', 'login': '2/min', 'register': '1/min'}
+        patcher = mock.patch.dict(TokenBucketThrottle.THROTTLE_RATES, rates)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_bucket_keys_on_authenticated_token(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/books/').status_code, status.HTTP_200_OK)
+        # The token is served from the token cache, so rejecting it is free
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/books/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+        # Made-up tokens fail authentication instead of getting buckets of their own
+        self.client.credentials(HTTP_AUTHORIZATION='Token made-up')
+        self.assertEqual(self.client.get('/api/books/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Other tokens have their own bucket
+        from rest_framework.authtoken.models import Token
+
+        other = User.objects.create_user(username='other', password='testpass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other).key}')
+        self.assertEqual(self.client.get('/api/books_all/').status_code, status.HTTP_200_OK)
+
+    def test_address_bucket_rejects_before_authentication(self):
+        from .throttling import TokenBucketThrottle
+
+        TokenBucketThrottle.THROTTLE_RATES['address'] = '2/min'
+        for number in range(2):
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token guess{number}')
+            self.client.get('/api/books/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/books/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_async_path_shares_buckets(self):
+        self.client.get('/api/books/')
+        self.client.get('/api/async/books/')
+        response = self.client.get('/api/async/books_all/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    def test_login_and_register_throttled_by_address(self):
+        client = APIClient()
+        for _ in range(2):
+            response = client.post('/api/auth/login/', {'username': 'reader', 'password': 'wrong'})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        with self.assertNumQueries(0):
+            response = client.post('/api/auth/token/', {'username': 'reader', 'password': 'testpass'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = client.post('/api/auth/register/', {'username': 'new', 'password': 'pass1234'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(0):
+            response = client.post('/api/auth/register/', {'username': 'newer', 'password': 'pass1234'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_authenticated_buckets_share_one_round_trip(self):
+        from unittest import mock
+
+        self.client.get('/api/books/')
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            self.client.get('/api/books/')
+        # One batch for the address bucket, one for the token and user buckets
+        self.assertEqual(get_many.call_count, 2)
+        self.assertEqual(set_many.call_count, 2)
+        self.assertEqual(len(set_many.call_args.args[0]), 2)
+
+    def test_bucket_refills(self):
+        from .throttling import LocalBucketStore
+
+        store = LocalBucketStore()
+        self.assertEqual([store.take('k', 2, 1.0, 100.0) for _ in range(3)], [0, 0, 1.0])
+        self.assertEqual(store.take('k', 2, 1.0, 100.5), 0.5)
+        self.assertEqual(store.take('k', 2, 1.0, 101.0), 0)
+
+    def test_local_store_evicts_and_prunes_without_full_scans(self):
+        from django.test import override_settings
+        from .throttling import LocalBucketStore
+
+        store = LocalBucketStore()
+        with override_settings(API_THROTTLE={'MAX_BUCKETS': 2, 'PRUNE_INTERVAL': 60}):
+            for key in 'abc':
+                store.take(key, 2, 1.0, 100.0)
+            # Over the bound, the least recently used bucket goes
+            self.assertEqual(list(store._buckets), ['b', 'c'])
+            # Full buckets are swept once PRUNE_INTERVAL has passed
+            store.take('d', 2, 1.0, 130.0)
+            self.assertEqual(list(store._buckets), ['c', 'd'])
+            store.take('e', 2, 1.0, 161.0)
+            self.assertEqual(list(store._buckets), ['e'])
+
+    def test_local_store(self):
+        from django.test import override_settings
+        from .throttling import local_store
+
+        self.addCleanup(local_store.clear)
+        with override_settings(API_THROTTLE={'STORE': 'local'}):
+            self.client.get('/api/books/')
+            self.client.get('/api/books/')
+            response = self.client.get('/api/books/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(local_store._buckets)
+
+    def test_deploy_check_requires_shared_store(self):
+        from django.test import override_settings
+        from .checks import check_throttle_store
+
+        self.assertEqual([error.id for error in check_throttle_store(None)], ['api.E001'])
+        with override_settings(API_THROTTLE={'STORE': 'local'}):
+            self.assertEqual(check_throttle_store(None), [])
+
+
+class PasswordHashingTestCase(TestCase):
+    def setUp(self):
+        from .hashing import hash_metrics
+
+        hash_metrics.reset()
+        self.addCleanup(hash_metrics.reset)
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.client = APIClient()
+
+    def test_login_and_register_hash_on_pool(self):
+        from .hashing import hash_metrics
+
+        response = self.client.post('/api/auth/login/', {'username': 'reader', 'password': 'testpass'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post('/api/auth/login/', {'username': 'reader', 'password': 'wrong'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post('/api/auth/register/', {'username': 'New', 'password': 'pass1234'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(User.objects.get(username='New').check_password('pass1234'))
+        self.assertEqual(hash_metrics.snapshot()['count'], 3)
+
+    def test_failed_login_sends_signal(self):
+        from django.contrib.auth.signals import user_login_failed
+
+        failures = []
+
+        def receiver(credentials, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.client.post('/api/auth/login/', {'username': 'reader', 'password': 'wrong'})
+        self.client.post('/api/auth/login/', {'username': 'reader', 'password': 'testpass'})
+        self.assertEqual(failures, [{'username': 'reader', 'password': '*' * 20}])
+
+    def test_saturated_pool_fails_fast(self):
+        import threading
+        from django.test import override_settings
+        from .hashing import HashingPool, HashingUnavailable
+
+        pool = HashingPool()
+        self.addCleanup(pool.shutdown)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_hash():
+            started.set()
+            release.wait()
+
+        with override_settings(API_PASSWORD_HASHING={'WORKERS': 1, 'QUEUE_DEPTH': 0}):
+            busy = threading.Thread(target=pool.run, args=(slow_hash,))
+            busy.start()
+            started.wait()
+            with self.assertRaises(HashingUnavailable):
+                pool.run(len, 'x')
+            release.set()
+            busy.join()
+            self.assertEqual(pool.run(len, 'x'), 1)
+        self.assertEqual(pool.metrics.snapshot()['rejected'], 1)
+
+    def test_login_returns_503_when_pool_is_full(self):
+        from unittest import mock
+        from .hashing import HashingUnavailable, hashing_pool
+
+        credentials = {'username': 'reader', 'password': 'testpass'}
+        with mock.patch.object(hashing_pool, 'run', side_effect=HashingUnavailable):
+            response = self.client.post('/api/auth/login/', credentials)
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response['Retry-After'], '1')
+            response = self.client.post('/api/auth/token/', credentials)
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            # Session logins outside DRF never touch the pool
+            response = self.client.post('/api-auth/login/', credentials)
+            self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+    def test_metrics_are_staff_only(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get('/api/auth/hash-metrics/').status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        response = self.client.get('/api/auth/hash-metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {
+            'count', 'seconds_sum', 'seconds_max', 'queue_seconds_sum', 'rejected', 'timed_out', 'buckets',
+        })
+
+
+class TokenIssuanceTestCase(TestCase):
+    def setUp(self):
+        from .authentication import token_cache
+
+        token_cache.clear()
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.client = APIClient()
+
+    def login(self):
+        return APIClient().post('/api/auth/login/', {'username': 'reader', 'password': 'testpass'})
+
+    def test_repeat_login_skips_token_query(self):
+        key = self.login().data['token']
+        # Only the user lookup remains
+        with self.assertNumQueries(1):
+            self.assertEqual(self.login().data['token'], key)
+        response = self.client.post('/api/auth/token/', {'username': 'reader', 'password': 'testpass'})
+        self.assertEqual(response.data['token'], key)
+
+    def test_register_creates_token_with_user(self):
+        with self.assertNumQueries(5):
+            response = self.client.post('/api/auth/register/', {'username': 'new', 'password': 'pass1234'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        self.assertEqual(self.client.get('/api/auth/profile/').data['username'], 'new')
+
+    def test_logout_elsewhere_is_seen_by_the_next_login(self):
+        from rest_framework.authtoken.models import Token
+
+        key = self.login().data['token']
+        # Another worker logs the user out; the map lives in the shared cache
+        Token.objects.get(key=key).delete()
+        self.assertIsNone(cache.get(f'api:user-token:{self.user.pk}'))
+        new = self.login().data['token']
+        self.assertNotEqual(new, key)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {new}')
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, status.HTTP_200_OK)
+
+    def test_rotation_revokes_old_key(self):
+        old = self.login().data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {old}')
+        self.client.get('/api/auth/profile/')
+        new = self.client.post('/api/auth/token/rotate/').data['token']
+        self.assertNotEqual(new, old)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login().data['token'], new)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {new}')
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, status.HTTP_200_OK)
+
+    def test_expired_tokens_are_rejected_renewed_and_swept(self):
+        import datetime
+        from io import StringIO
+        from django.core.management import call_command
+        from django.test import override_settings
+        from django.utils import timezone
+        from rest_framework.authtoken.models import Token
+
+        old = self.login().data['token']
+        Token.objects.filter(key=old).update(created=timezone.now() - datetime.timedelta(hours=2))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {old}')
+        with override_settings(API_TOKENS={'TTL': 3600}):
+            response = self.client.get('/api/auth/profile/')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(str(response.data['detail']), 'Token has expired.')
+
+            from .tokens import user_tokens
+            user_tokens.delete(self.user.pk)
+            self.assertNotEqual(self.login().data['token'], old)
+
+            stale = User.objects.create_user(username='stale', password='testpass')
+            Token.objects.create(user=stale)
+            Token.objects.filter(user=stale).update(created=timezone.now() - datetime.timedelta(hours=2))
+            call_command('sweep_tokens', stdout=StringIO())
+        self.assertFalse(Token.objects.filter(user=stale).exists())
+        self.assertEqual(Token.objects.count(), 1)
@@ -0,0 +1,250 @@
+"""
+Token-bucket throttling for the auth and book endpoints.
+
+A rate of ``N/period`` (DRF's ``DEFAULT_THROTTLE_RATES`` syntax) allows
+bursts of ``N`` requests and refills continuously at ``N / period`` tokens a
+second. Each client costs two numbers in the bucket store instead of DRF's
+list of request timestamps.
+
+Throttles flagged ``before_authentication`` only look at the raw request
+(the client address), so views using ``ThrottleBeforeAuthenticationMixin``
+reject them before the token or session lookup runs. Per-token and per-user
+buckets are keyed on the authenticated identity, so made-up tokens never get
+buckets of their own; they are held back by the address bucket.
+
+Buckets live in the store picked by the ``API_THROTTLE`` setting::
+
+    API_THROTTLE = {
+        'STORE': 'cache',           # 'cache' (shared) or 'local' (per process)
+        'CACHE_ALIAS': 'default',   # used by the 'cache' store
+        'MAX_BUCKETS': 100000,      # size bound for the 'local' store
+        'PRUNE_INTERVAL': 60,       # seconds between sweeps of the 'local' store
+    }
+
+The cache store enforces one limit across every worker as long as
+``CACHE_ALIAS`` names a cache they share (Redis, memcached);
+``manage.py check --deploy`` reports a per-process one as ``api.E001``. Like DRF's
+own throttles, it does not lock across processes, so concurrent requests
+from one client may get a few extra requests through. ``run_throttles``
+takes from every bucket of a phase in one batch, so the per-token and
+per-user buckets cost a single ``get_many``/``set_many`` pair. The local
+store is an in-process dict for single-process deployments and tests.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+DEFAULTS = {
+    'STORE': 'cache',
+    'CACHE_ALIAS': 'default',
+    'MAX_BUCKETS': 100000,
+    'PRUNE_INTERVAL': 60,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'API_THROTTLE', {})}
+
+
+def take_token(tokens, stamp, capacity, refill_rate, now):
+    """
+    Refill a bucket holding ``tokens`` at ``stamp`` up to ``now`` and take
+    one token. Returns the new level and the wait (0 when taken).
+    """
+    tokens = min(capacity, tokens + (now - stamp) * refill_rate)
+    wait = 0 if tokens >= 1 else (1 - tokens) / refill_rate
+    if not wait:
+        tokens -= 1
+    return tokens, wait
+
+
+class LocalBucketStore:
+    # Pure in-memory work, safe to call from the event loop
+    blocking = False
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned_at = None
+
+    def take(self, key, capacity, refill_rate, now):
+        """
+        Take one token from ``key``'s bucket. Returns 0 on success, otherwise
+        the number of seconds until a token is available.
+        """
+        return self.take_many([(key, capacity, refill_rate)], now)[0]
+
+    def take_many(self, buckets, now):
+        """``take`` for each ``(key, capacity, refill_rate)``, in one go."""
+        config = get_config()
+        waits = []
+        with self._lock:
+            for key, capacity, refill_rate in buckets:
+                tokens, stamp, _ = self._buckets.get(key, (capacity, now, now))
+                tokens, wait = take_token(tokens, stamp, capacity, refill_rate, now)
+                self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_rate)
+                # Kept in least-recently-used order, so eviction is O(1)
+                self._buckets.move_to_end(key)
+                waits.append(wait)
+            while len(self._buckets) > config['MAX_BUCKETS']:
+                self._buckets.popitem(last=False)
+            if self._pruned_at is None or now - self._pruned_at >= config['PRUNE_INTERVAL']:
+                self.prune(now)
+        return waits
+
+    def prune(self, now):
+        # Full buckets carry no state
+        self._pruned_at = now
+        for key in [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._pruned_at = None
+
+
+class CacheBucketStore:
+    blocking = True
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, refill_rate, now):
+        return self.take_many([(key, capacity, refill_rate)], now)[0]
+
+    def take_many(self, buckets, now):
+        # One read and one write however many buckets the request touches
+        current = self.cache.get_many([key for key, _, _ in buckets])
+        updates, waits, timeout = {}, [], 0
+        for key, capacity, refill_rate in buckets:
+            tokens, stamp = current.get(key, (capacity, now))
+            tokens, wait = take_token(tokens, stamp, capacity, refill_rate, now)
+            updates[key] = (tokens, now)
+            waits.append(wait)
+            # Expire the entries once every bucket would be full again
+            timeout = max(timeout, math.ceil((capacity - tokens) / refill_rate) + 1)
+        self.cache.set_many(updates, timeout=timeout)
+        return waits
+
+
+local_store = LocalBucketStore()
+
+
+def get_store():
+    config = get_config()
+    if config['STORE'] == 'cache':
+        return CacheBucketStore(config['CACHE_ALIAS'])
+    return local_store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    ``SimpleRateThrottle`` with token-bucket semantics. Subclasses set
+    ``scope`` and implement ``get_cache_key``; returning ``None`` skips the
+    throttle for that request.
+    """
+    before_authentication = False
+    cache_format = 'api:throttle:%(scope)s:%(ident)s'
+
+    def get_bucket(self, request, view):
+        """Returns ``(key, capacity, refill_rate)``, or ``None`` to skip."""
+        if self.rate is None:
+            return None
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return None
+        return self.key, self.num_requests, self.num_requests / self.duration
+
+    def allow_request(self, request, view):
+        bucket = self.get_bucket(request, view)
+        self.wait_time = get_store().take(*bucket, self.timer()) if bucket else 0
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class TokenKeyThrottle(TokenBucketThrottle):
+    """Per-token limit, keyed on the token that authenticated the request."""
+    scope = 'token'
+
+    def get_cache_key(self, request, view):
+        key = getattr(request.auth, 'key', None)
+        if not key:
+            return None
+        # Never put raw token keys into a shared cache
+        ident = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Per-user limit across all of a user's tokens and sessions."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        # Anonymous requests are covered by the address bucket
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class ClientThrottle(TokenBucketThrottle):
+    """Per-address limit for unauthenticated endpoints."""
+    before_authentication = True
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class AddressThrottle(ClientThrottle):
+    """Per-address limit checked before any credentials are looked at."""
+    scope = 'address'
+
+
+class LoginThrottle(ClientThrottle):
+    scope = 'login'
+
+
+class RegisterThrottle(ClientThrottle):
+    scope = 'register'
+
+
+class ThrottleBeforeAuthenticationMixin:
+    """
+    Runs throttles flagged ``before_authentication`` ahead of
+    ``perform_authentication``; the rest run at DRF's usual point, after the
+    permission checks.
+    """
+    def perform_authentication(self, request):
+        self.run_throttles(request, before_authentication=True)
+        super().perform_authentication(request)
+
+    def check_throttles(self, request):
+        self.run_throttles(request, before_authentication=False)
+
+    def run_throttles(self, request, before_authentication):
+        durations = []
+        buckets = []
+        for throttle in self.get_throttles():
+            if getattr(throttle, 'before_authentication', False) != before_authentication:
+                continue
+            if not isinstance(throttle, TokenBucketThrottle):
+                if not throttle.allow_request(request, self):
+                    durations.append(throttle.wait())
+                continue
+            bucket = throttle.get_bucket(request, self)
+            if bucket is not None:
+                buckets.append(bucket)
+        if buckets:
+            waits = get_store().take_many(buckets, time.time())
+            durations.extend(wait for wait in waits if wait)
+        if durations:
+            durations = [duration for duration in durations if duration is not None]
+            self.throttled(request, max(durations, default=None))
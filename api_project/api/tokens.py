@@ -0,0 +1,121 @@
+"""
+Token issuance, rotation and expiry.
+
+``issue_token`` replaces ``Token.objects.get_or_create`` on login. It keeps
+a ``user -> token`` map in a Django cache, so repeat logins by the same user
+skip the token query. ``create_user_with_token`` creates the user and its token in
+one transaction. ``rotate_token`` swaps a user's token for a new key.
+
+When ``TTL`` is set, tokens older than ``TTL`` seconds stop authenticating
+(see ``CachedTokenAuthentication``) and are replaced on the next login.
+Expired rows are deleted by ``sweep_expired_tokens``; schedule the
+``sweep_tokens`` management command (cron, a scheduler) so exactly one
+process runs it, rather than a thread in every server worker.
+
+Configured through the ``API_TOKENS`` setting::
+
+    API_TOKENS = {
+        'TTL': None,               # token lifetime in seconds; None never expires
+        'CACHE_ALIAS': 'default',  # holds the user -> token map
+    }
+
+The map must live in a cache every worker shares (Redis, memcached): the
+receivers in ``api.models`` drop a user's entry when the token is deleted
+(logout, rotation, sweeps) or the user is saved, and a per-process copy
+would keep handing out the deleted key. ``manage.py check --deploy``
+reports a per-process cache as ``api.E002``. Entries expire after
+``API_TOKEN_CACHE['TTL']``.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_config as get_cache_config
+
+DEFAULTS = {
+    'TTL': None,
+    'CACHE_ALIAS': 'default',
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'API_TOKENS', {})}
+
+
+class UserTokenMap:
+    """``user id -> Token`` in the ``CACHE_ALIAS`` cache."""
+    key_prefix = 'api:user-token:'
+
+    def cache(self):
+        return caches[get_config()['CACHE_ALIAS']]
+
+    def get(self, user_id):
+        return self.cache().get(f'{self.key_prefix}{user_id}')
+
+    def set(self, user_id, token):
+        self.cache().set(f'{self.key_prefix}{user_id}', token, timeout=get_cache_config()['TTL'])
+
+    def delete(self, user_id):
+        self.cache().delete(f'{self.key_prefix}{user_id}')
+
+
+user_tokens = UserTokenMap()
+
+
+def expiry_cutoff():
+    ttl = get_config()['TTL']
+    return timezone.now() - datetime.timedelta(seconds=ttl) if ttl else None
+
+
+def is_expired(token, cutoff=None):
+    cutoff = cutoff or expiry_cutoff()
+    return cutoff is not None and token.created <= cutoff
+
+
+def remember(user, token):
+    user_tokens.set(user.pk, token)
+    return token
+
+
+def issue_token(user):
+    """Return ``user``'s current token, creating or renewing it if needed."""
+    cached = user_tokens.get(user.pk)
+    if cached is not None and not is_expired(cached):
+        return cached
+    token = Token.objects.filter(user=user).first()
+    if token is None:
+        token = Token.objects.create(user=user)
+    elif is_expired(token):
+        return rotate_token(user)
+    return remember(user, token)
+
+
+def rotate_token(user):
+    """Replace ``user``'s token with a new key. The old key stops working."""
+    with transaction.atomic():
+        # post_delete evicts the old key from both caches
+        Token.objects.filter(user=user).delete()
+        token = Token.objects.create(user=user)
+    return remember(user, token)
+
+
+def create_user_with_token(user):
+    """Save a new ``user`` and create its token in the same transaction."""
+    with transaction.atomic():
+        user.save()
+        token = Token.objects.create(user=user)
+    return remember(user, token)
+
+
+def sweep_expired_tokens():
+    """Delete expired tokens and return how many were removed."""
+    cutoff = expiry_cutoff()
+    if cutoff is None:
+        return 0
+    deleted, _ = Token.objects.filter(created__lte=cutoff).delete()
+    return deleted
+
@@ -1,8 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework.authtoken.views import obtain_auth_token
 from .views import BookList, BookViewSet
-from .auth_views import CustomAuthToken, register_user, logout_user, user_profile
+from .async_views import AsyncBookReadView
+from .auth_views import (
+    CustomAuthToken, ThrottledObtainAuthToken, register_user, logout_user, user_profile,
+    rotate_user_token, password_hash_metrics,
+)
 
 # Create a router and register our ViewSet with it
 router = DefaultRouter()
@@ -14,14 +17,21 @@ app_name = 'api'
 urlpatterns = [
     # Authentication endpoints
     path('auth/login/', CustomAuthToken.as_view(), name='login'),
-    path('auth/token/', obtain_auth_token, name='obtain_token'),  # Alternative login endpoint
+    path('auth/token/', ThrottledObtainAuthToken.as_view(), name='obtain_token'),  # Alternative login endpoint
     path('auth/register/', register_user, name='register'),
     path('auth/logout/', logout_user, name='logout'),
+    path('auth/token/rotate/', rotate_user_token, name='rotate_token'),
     path('auth/profile/', user_profile, name='profile'),
+    path('auth/hash-metrics/', password_hash_metrics, name='hash-metrics'),
     
     # Book endpoints
     path('books/', BookList.as_view(), name='book-list'),  # Simple list view (authenticated)
     
+    # Async (ASGI-native) read endpoints mirroring the ones above
+    path('async/books/', AsyncBookReadView.as_view(view_class=BookList), name='async-book-list'),
+    path('async/books_all/', AsyncBookReadView.as_view(), name='async-book-all-list'),
+    path('async/books_all/<int:pk>/', AsyncBookReadView.as_view(), name='async-book-all-detail'),
+    
     # Include the router URLs for BookViewSet (all CRUD operations)
     path('', include(router.urls)),  # This includes all routes registered with the router
 ]
\ No newline at end of file
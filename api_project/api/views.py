@@ -1,33 +1,58 @@
+from django.db.models import Sum
 from rest_framework import generics, viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, IsAdminUser
-from .models import Book
-from .serializers import BookSerializer
+from .models import AuthorStats, Book
+from .serializers import BookSerializer, get_field_plan
+from .bulk import bulk_delete_books, bulk_update_books, bulk_upsert_books
+from .parsers import FastJSONParser, NDJSONParser
+from .export import EXPORT_FORMATS, stream_books
+from .conditional import ConditionalGetMixin
+from .pagination import BookPagination
+from .search import search_books
+from .throttling import ThrottleBeforeAuthenticationMixin
 from .permissions import IsStaffOrReadOnly, IsAuthorOrReadOnly
 
 
-class BookList(generics.ListAPIView):
+class ValuesListMixin:
+    """
+    Serve `list` from `.values()` rows rendered by the serializer's
+    precompiled field plan instead of instantiating and serializing models.
+    Output is identical to the regular ListModelMixin.
+    """
+    def list(self, request, *args, **kwargs):
+        plan = get_field_plan(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset()).values(*plan.columns)
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.render_many(page))
+        return Response(plan.render_many(queryset))
+
+
+class BookList(ThrottleBeforeAuthenticationMixin, ConditionalGetMixin, ValuesListMixin, generics.ListAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = BookPagination
     
     def get_queryset(self):
         queryset = Book.objects.all()
         
-        # Optional: Add filtering capabilities
+        # Optional: Add filtering capabilities (served by the search index)
         author = self.request.query_params.get('author', None)
-        if author is not None:
-            queryset = queryset.filter(author__icontains=author)
-            
         title = self.request.query_params.get('title', None)
-        if title is not None:
-            queryset = queryset.filter(title__icontains=title)
+        if author is None and title is None:
+            return queryset.order_by('title')
             
-        return queryset.order_by('title')
+        queryset = search_books(queryset, author=author, title=title)
+        return queryset.order_by('search_rank', 'title')
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ThrottleBeforeAuthenticationMixin, ConditionalGetMixin, ValuesListMixin,
+                  viewsets.ModelViewSet):
     """
     A ViewSet for viewing and editing Book instances.
     
@@ -46,35 +71,43 @@ class BookViewSet(viewsets.ModelViewSet):
     - PUT /books_all/{id}/ - Update a specific book (staff only)
     - PATCH /books_all/{id}/ - Partial update a specific book (staff only)
     - DELETE /books_all/{id}/ - Delete a specific book (staff only)
+    - POST/PUT/PATCH/DELETE /books_all/bulk/ - Bulk writes (staff only)
+    - GET /books_all/export/?output=ndjson|csv - Stream every matching book
+    
+    Pagination: page numbers by default (`?page=N`); pass `?cursor=` to switch
+    to keyset pagination ordered on (title, id), which skips the count query.
+    
+    Caching: list and retrieve send ETag/Last-Modified and answer matching
+    conditional requests with 304 Not Modified.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsStaffOrReadOnly]  # Staff can write, authenticated users can read
+    pagination_class = BookPagination
     
     def get_queryset(self):
         queryset = Book.objects.all()
         
-        # Add filtering capabilities
+        # Add filtering capabilities (served by the search index)
         author = self.request.query_params.get('author', None)
-        if author is not None:
-            queryset = queryset.filter(author__icontains=author)
-            
         title = self.request.query_params.get('title', None)
-        if title is not None:
-            queryset = queryset.filter(title__icontains=title)
+        queryset = search_books(queryset, author=author, title=title)
             
         # Filter by publication year
         year = self.request.query_params.get('year', None)
         if year is not None:
             queryset = queryset.filter(publication_date__year=year)
             
+        # Rank text matches first; keyset mode re-orders on (title, id)
+        if author is not None or title is not None:
+            return queryset.order_by('search_rank', 'title')
         return queryset.order_by('title')
     
     def get_permissions(self):
-        if self.action == 'list' or self.action == 'retrieve':
+        if self.action in ['list', 'retrieve', 'export']:
             # Read-only actions: require authentication only
             permission_classes = [IsAuthenticated]
-        elif self.action in ['create', 'update', 'partial_update', 'destroy']:
+        elif self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk']:
             # Write actions: require staff permissions
             permission_classes = [IsAuthenticated, IsAdminUser]
         else:
@@ -122,6 +155,51 @@ class BookViewSet(viewsets.ModelViewSet):
             'deleted_by': request.user.username
         }, status=status.HTTP_204_NO_CONTENT)
     
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'],
+            parser_classes=[FastJSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Bulk writes from a JSON array or NDJSON body:
+        - POST: create books; rows whose isbn already exists update that book
+        - PUT/PATCH: update books, each item carrying its `id`
+        - DELETE: delete books by id
+        Nothing is written if any row is invalid; errors are returned per row.
+        """
+        if request.method == 'POST':
+            created, updated = bulk_upsert_books(request.data)
+            return Response({
+                'message': 'Books imported successfully',
+                'created': created,
+                'updated': updated,
+                'imported_by': request.user.username
+            }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+        
+        if request.method == 'DELETE':
+            deleted = bulk_delete_books(request.data)
+            return Response({
+                'message': 'Books deleted successfully',
+                'deleted': deleted,
+                'deleted_by': request.user.username
+            })
+        
+        updated = bulk_update_books(request.data, partial=request.method == 'PATCH')
+        return Response({
+            'message': 'Books updated successfully',
+            'updated': updated,
+            'updated_by': request.user.username
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """Stream all books matching the list filters as NDJSON (default) or CSV."""
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'Unsupported output format. Choose one of: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return stream_books(self.get_queryset(), export_format)
+    
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def by_author(self, request):
         author = request.query_params.get('author', None)
@@ -131,7 +209,7 @@ class BookViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        books = self.queryset.filter(author__icontains=author)
+        books = search_books(self.queryset, author=author).order_by('search_rank', 'title')
         serializer = self.get_serializer(books, many=True)
         
         return Response({
@@ -152,13 +230,21 @@ class BookViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def admin_stats(self, request):
-        total_books = self.queryset.count()
-        authors = self.queryset.values_list('author', flat=True).distinct()
+        # Served from the materialized AuthorStats table, never the books table
+        stats = AuthorStats.objects.filter(book_count__gt=0)
+        total_books = stats.aggregate(total=Sum('book_count'))['total'] or 0
+        paginator = PageNumberPagination()
+        page = paginator.paginate_queryset(stats, request, view=self)
         
         return Response({
             'total_books': total_books,
-            'total_authors': len(authors),
-            'authors': list(authors),
+            'total_authors': paginator.page.paginator.count,
+            'authors': [
+                {'author': entry.author, 'book_count': entry.book_count}
+                for entry in page
+            ],
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
             'requested_by': request.user.username
         })
 
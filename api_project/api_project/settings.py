@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,10 +22,12 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',          # Django REST Framework
     'rest_framework.authtoken', # Token authentication
-    'api',                     
+    'api',
+    'instrumentation',
 ]
 
 MIDDLEWARE = [
+    'instrumentation.middleware.InstrumentationMiddleware',  # first, so timings cover the whole chain
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,6 +37,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+INSTRUMENTATION = {
+    'ENABLED': True,  # query counts, N+1 warnings, Server-Timing and /metrics/
+    'SERVER_TIMING': 'staff',  # header for staff users and DEBUG only; True for everyone, False for no one
+    'DUPLICATE_THRESHOLD': 3,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+# `manage.py test` without labels also runs the instrumentation tests
+TEST_RUNNER = 'instrumentation.runner.InstrumentationDiscoverRunner'
+
 ROOT_URLCONF = 'api_project.urls'
 
 TEMPLATES = [
@@ -66,6 +78,29 @@ DATABASES = {
 }
 
 
+# Cache
+# Throttle buckets, the user -> token map and the token revocation counter
+# must be shared by every worker process. REDIS_URL selects Redis (needs the
+# redis package); without it the per-process cache is only fit for
+# development, and `manage.py check --deploy` reports api.E001-E003.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -107,10 +142,14 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Serve the HTML browsable API only in development; production settings can
+# set this to False to leave JSON as the only renderer
+BROWSABLE_API = DEBUG
+
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -119,7 +158,46 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ]
-}
\ No newline at end of file
+        'api.renderers.FastJSONRenderer',  # orjson when installed, stdlib otherwise
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if BROWSABLE_API else []),
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.AddressThrottle',  # checked before authentication
+        'api.throttling.TokenKeyThrottle',
+        'api.throttling.UserThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'address': '1200/min',
+        'token': '300/min',
+        'user': '600/min',
+        'login': '10/min',
+        'register': '5/hour',
+    },
+}
+
+API_PASSWORD_HASHING = {
+    'WORKERS': 2,  # hashing threads per process; 0 hashes inline on the request thread
+    'QUEUE_DEPTH': 2,  # hashes waiting beyond this many fail fast with 503
+    'TIMEOUT': 5,  # seconds
+}
+API_THROTTLE = {
+    'STORE': 'cache',  # buckets shared between workers through CACHE_ALIAS; 'local' keeps them per process
+    'CACHE_ALIAS': 'default',
+    'MAX_BUCKETS': 100000,  # 'local' store only
+    'PRUNE_INTERVAL': 60,  # seconds; 'local' store only
+}
+API_TOKENS = {
+    'TTL': None,  # token lifetime in seconds; None never expires. Schedule sweep_tokens when set
+    'CACHE_ALIAS': 'default',  # user -> token map behind login; must be shared between workers
+}
+# Cache for authenticated tokens (see api/authentication.py)
+API_TOKEN_CACHE = {
+    'TTL': 60,  # seconds
+    'MAX_ENTRIES': 10000,
+    'CACHE_ALIAS': None,  # set to a shared cache alias to enable the second tier
+    'GENERATION_ALIAS': 'default',  # revocation counter; must be shared between workers
+}
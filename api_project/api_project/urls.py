@@ -19,6 +19,7 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('', include('instrumentation.urls')),  # /metrics/ for Prometheus
     path('api/', include('api.urls')),  
     path('api-auth/', include('rest_framework.urls')),
 ]
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+Compare the sync WSGI and async ASGI read paths under concurrent load.
+
+Seeds a throwaway SQLite database, starts the project twice under uvicorn
+(once through its WSGI interface, once as ASGI) and fires the same number of
+concurrent GETs at the sync endpoints on the first and the async endpoints
+on the second.
+
+    python benchmarks/async_vs_sync.py --books 5000 --requests 2000 --concurrency 50
+
+Requires ``uvicorn`` and ``httpx`` (both in requirements.txt).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    'list': ('/api/books_all/?page=3', '/api/async/books_all/?page=3'),
+    'keyset': ('/api/books_all/?cursor=&page_size=50', '/api/async/books_all/?cursor=&page_size=50'),
+    'search': ('/api/books_all/?title=book 1', '/api/async/books_all/?title=book 1'),
+    'detail': ('/api/books_all/{pk}/', '/api/async/books_all/{pk}/'),
+}
+
+
+def seed(books):
+    import django
+
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+
+    from api.bulk import bulk_upsert_books
+
+    call_command('migrate', verbosity=0)
+    rows = [{'title': f'Book {i}', 'author': f'Author {i % 97}'} for i in range(books)]
+    bulk_upsert_books(rows)
+    user = User.objects.create_user(username='bench', password='bench-pass-123')
+    return Token.objects.create(user=user).key
+
+
+def start_server(target, port, interface):
+    command = [
+        sys.executable, '-m', 'uvicorn', target, '--port', str(port),
+        '--interface', interface, '--log-level', 'warning', '--app-dir', str(PROJECT_DIR),
+    ]
+    return subprocess.Popen(command, cwd=PROJECT_DIR, env=os.environ.copy())
+
+
+async def wait_until_up(base_url, timeout=20):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(base_url + '/api/')
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f'server at {base_url} did not start')
+
+
+async def load(base_url, path, token, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {'Authorization': f'Token {token}'}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path.format(pk=i % 1000 + 1))
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'errors': errors,
+    }
+
+
+async def run(args, token):
+    wsgi = start_server('api_project.wsgi:application', args.port, 'wsgi')
+    asgi = start_server('api_project.asgi:application', args.port + 1, 'asgi3')
+    wsgi_url = f'http://127.0.0.1:{args.port}'
+    asgi_url = f'http://127.0.0.1:{args.port + 1}'
+    try:
+        await wait_until_up(wsgi_url)
+        await wait_until_up(asgi_url)
+        print(f'{"scenario":<10}{"path":<6}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for name in args.scenarios:
+            sync_path, async_path = SCENARIOS[name]
+            for label, base_url, path in [('wsgi', wsgi_url, sync_path), ('asgi', asgi_url, async_path)]:
+                await load(base_url, path, token, min(50, args.requests), args.concurrency)  # warm up
+                result = await load(base_url, path, token, args.requests, args.concurrency)
+                print(f'{name:<10}{label:<6}{result["rps"]:>10.1f}{result["p50"]:>10.2f}'
+                      f'{result["p99"]:>10.2f}{result["errors"]:>8}')
+    finally:
+        for server in (wsgi, asgi):
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['BENCH_DB'] = str(Path(tmp) / 'bench.sqlite3')
+        os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+        sys.path.insert(0, str(PROJECT_DIR))
+        token = seed(args.books)
+        asyncio.run(run(args, token))
+
+
+if __name__ == '__main__':
+    main()
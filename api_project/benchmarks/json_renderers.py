@@ -0,0 +1,72 @@
+"""
+Micro-benchmark: stock JSONRenderer vs FastJSONRenderer (and the parsers)
+over ``BookSerializer`` output.
+
+    python benchmarks/json_renderers.py --rows 1000 --repeat 50
+"""
+import argparse
+import datetime
+import io
+import os
+import sys
+import timeit
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def build_payload(rows):
+    from api.models import Book
+    from api.serializers import BookSerializer
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    books = [
+        Book(id=i, title=f'Book {i}', author=f'Author {i % 97}', isbn=f'{i:013d}',
+             pages=100 + i % 900, publication_date=datetime.date(2000, 1, 1) + datetime.timedelta(days=i),
+             created_at=now, updated_at=now)
+        for i in range(rows)
+    ]
+    return {'count': rows, 'next': None, 'previous': None,
+            'results': BookSerializer(books, many=True).data}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.setdefault('BENCH_DB', ':memory:')
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    sys.path.insert(0, str(PROJECT_DIR))
+    import django
+
+    django.setup()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from api import parsers, renderers
+
+    if renderers.orjson is None:
+        print('orjson is not installed; FastJSONRenderer will use the stdlib fallback')
+
+    payload = build_payload(args.rows)
+    body = JSONRenderer().render(payload)
+    assert renderers.FastJSONRenderer().render(payload) == body
+
+    cases = [
+        ('render', 'JSONRenderer', lambda: JSONRenderer().render(payload)),
+        ('render', 'FastJSONRenderer', lambda: renderers.FastJSONRenderer().render(payload)),
+        ('parse', 'JSONParser', lambda: JSONParser().parse(io.BytesIO(body))),
+        ('parse', 'FastJSONParser', lambda: parsers.FastJSONParser().parse(io.BytesIO(body))),
+    ]
+    print(f'{args.rows} rows, {len(body)} bytes, best of 5 x {args.repeat} runs')
+    baseline = {}
+    for operation, name, func in cases:
+        best = min(timeit.repeat(func, number=args.repeat, repeat=5)) / args.repeat
+        baseline.setdefault(operation, best)
+        print(f'{operation:<8}{name:<18}{best * 1000:>9.3f} ms{baseline[operation] / best:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
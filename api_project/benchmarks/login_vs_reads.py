@@ -0,0 +1,104 @@
+"""
+Measure sustained login rate and read latency while both run concurrently.
+
+Seeds a throwaway SQLite database and starts the project under uvicorn's WSGI
+interface once with password hashing inline on the request threads and once
+per requested hashing-pool size. Each run keeps ``--logins`` clients posting
+to ``/api/auth/login/`` and ``--readers`` clients reading a book page for
+``--seconds`` seconds.
+
+    python benchmarks/login_vs_reads.py --logins 20 --readers 20 --seconds 10 --workers 0 2
+
+Requires ``uvicorn`` and ``httpx`` (both in requirements.txt).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from async_vs_sync import PROJECT_DIR, seed, start_server, wait_until_up
+
+READ_PATH = '/api/books_all/?page=3'
+CREDENTIALS = {'username': 'bench', 'password': 'bench-pass-123'}
+
+
+async def client_loop(client, request, deadline, latencies, statuses):
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        response = await request(client)
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def measure(base_url, token, args):
+    login_latencies, login_statuses = [], {}
+    read_latencies, read_statuses = [], {}
+    limits = httpx.Limits(max_connections=args.logins + args.readers)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        def login(client):
+            return client.post('/api/auth/login/', json=CREDENTIALS)
+
+        def read(client):
+            return client.get(READ_PATH, headers={'Authorization': f'Token {token}'})
+
+        deadline = time.monotonic() + args.seconds
+        await asyncio.gather(
+            *(client_loop(client, login, deadline, login_latencies, login_statuses)
+              for _ in range(args.logins)),
+            *(client_loop(client, read, deadline, read_latencies, read_statuses)
+              for _ in range(args.readers)),
+        )
+
+    read_latencies.sort()
+    return {
+        'logins': login_statuses.get(200, 0) / args.seconds,
+        'rejected': login_statuses.get(503, 0),
+        'reads': read_statuses.get(200, 0) / args.seconds,
+        'p50': statistics.median(read_latencies) * 1000,
+        'p99': read_latencies[int(len(read_latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def run(args, token):
+    print(f'{"hash workers":<14}{"logins/s":>10}{"503s":>8}{"reads/s":>10}{"read p50":>10}{"read p99":>10}')
+    for workers in args.workers:
+        os.environ['BENCH_HASH_WORKERS'] = str(workers)
+        server = start_server('api_project.wsgi:application', args.port, 'wsgi')
+        base_url = f'http://127.0.0.1:{args.port}'
+        try:
+            await wait_until_up(base_url)
+            result = await measure(base_url, token, args)
+        finally:
+            server.terminate()
+            server.wait()
+        label = str(workers) if workers else 'inline'
+        print(f'{label:<14}{result["logins"]:>10.1f}{result["rejected"]:>8}{result["reads"]:>10.1f}'
+              f'{result["p50"]:>10.2f}{result["p99"]:>10.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--readers', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2])
+    parser.add_argument('--port', type=int, default=8775)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['BENCH_DB'] = str(Path(tmp) / 'bench.sqlite3')
+        os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+        sys.path.insert(0, str(PROJECT_DIR))
+        token = seed(args.books)
+        asyncio.run(run(args, token))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+# Settings for the benchmark scripts: the project settings pointed at a
+# throwaway database chosen through the BENCH_DB environment variable.
+import os
+
+from api_project.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+DATABASES['default']['NAME'] = os.environ['BENCH_DB']  # noqa: F405
+
+# Load generators hammer one token from one address
+REST_FRAMEWORK = {  # noqa: F405
+    **REST_FRAMEWORK,  # noqa: F405
+    'DEFAULT_THROTTLE_CLASSES': [],
+    'DEFAULT_THROTTLE_RATES': {'login': None, 'register': None},
+}
+
+if 'BENCH_HASH_WORKERS' in os.environ:
+    API_PASSWORD_HASHING = {**API_PASSWORD_HASHING, 'WORKERS': int(os.environ['BENCH_HASH_WORKERS'])}  # noqa: F405
@@ -45,8 +45,10 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'bookshelf',
     'relationship_app',
+    'instrumentation',
 ]
 MIDDLEWARE = [
+    'instrumentation.middleware.InstrumentationMiddleware',  # first, so timings cover the whole chain
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',    
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +57,14 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',     
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+
+INSTRUMENTATION = {
+    'ENABLED': True,  # query counts, N+1 warnings, Server-Timing and /metrics/
+    'SERVER_TIMING': 'staff',  # header for staff users and DEBUG only; True for everyone, False for no one
+    'DUPLICATE_THRESHOLD': 3,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
 ROOT_URLCONF = 'LibraryProject.urls'
 
 TEMPLATES = [
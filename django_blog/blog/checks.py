@@ -0,0 +1,36 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+# Backends whose contents other worker processes cannot see
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+@register(deploy=True)
+def check_fragment_cache(app_configs, **kwargs):
+    from .fragments import get_config
+
+    if isinstance(caches[get_config()['CACHE_ALIAS']], PROCESS_LOCAL_CACHES):
+        return [Error(
+            "BLOG_FRAGMENT_CACHE['CACHE_ALIAS'] names a per-process cache, so a write in one worker "
+            "leaves the other workers serving stale fragments.",
+            hint='Set REDIS_URL or point CACHE_ALIAS at a Redis or memcached cache.',
+            id='blog.E001',
+        )]
+    return []
+
+
+@register(deploy=True)
+def check_page_cache(app_configs, **kwargs):
+    from .page_cache import get_config
+
+    config = get_config()
+    if config['ENABLED'] and isinstance(caches[config['CACHE_ALIAS']], PROCESS_LOCAL_CACHES):
+        return [Error(
+            "BLOG_PAGE_CACHE['CACHE_ALIAS'] names a per-process cache, so invalidation and the "
+            "revalidation lock do not reach the other workers.",
+            hint='Set REDIS_URL or point CACHE_ALIAS at a Redis or memcached cache.',
+            id='blog.E002',
+        )]
+    return []
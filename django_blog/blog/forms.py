@@ -18,6 +18,12 @@ class CustomUserCreationForm(UserCreationForm):
             user.save()
         return user
 
+class ProfileEditForm(forms.ModelForm):
+    class Meta:
+        model = User
+        fields = ['username', 'email']
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
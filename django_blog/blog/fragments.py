@@ -0,0 +1,105 @@
+"""
+Versioned template fragments for ``post_detail.html``.
+
+The post body (title, content, tags, byline) and the comment thread are
+cached as ``{% cache %}`` fragments keyed by the post id and a version
+number per part. Receivers in ``blog.models`` bump the versions:
+
+* ``post``: the post is saved, its tags change, one of its tags is
+  renamed, or its author is renamed;
+* ``comments``: a comment on the post is saved or deleted, or a commenter
+  is renamed.
+
+So a new comment re-renders only the comment thread, and a cache hit
+does no database work for that part. Old fragments are never deleted;
+they age out after ``TIMEOUT``. The counters themselves expire after
+``VERSION_TIMEOUT`` (never less than ``TIMEOUT``) and restart from the
+clock, and a deleted post's counters are dropped with it.
+
+The cached HTML is the same for every visitor. Per-user output (Edit /
+Delete links, the comment form) renders outside the fragments, or, for
+each comment's controls, is filled into placeholders by the
+``comment_controls`` filter.
+
+The version counters live in ``CACHE_ALIAS``, which every worker process
+must share (Redis, memcached): with a per-process cache, a comment saved in
+one worker never reaches the counters of the others, and they serve stale
+fragments until ``TIMEOUT``. ``manage.py check --deploy`` reports such a
+cache as ``blog.E001``.
+
+Configured through the ``BLOG_FRAGMENT_CACHE`` setting::
+
+    BLOG_FRAGMENT_CACHE = {
+        'CACHE_ALIAS': 'default',
+        'TIMEOUT': 600,                # seconds
+        'VERSION_TIMEOUT': 24 * 3600,  # seconds
+    }
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 600,
+    'VERSION_TIMEOUT': 24 * 3600,
+}
+
+PARTS = ('post', 'comments')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_FRAGMENT_CACHE', {})}
+
+
+def get_cache():
+    return caches[get_config()['CACHE_ALIAS']]
+
+
+def version_key(post_id, part):
+    return f'blog:fragments:{post_id}:{part}'
+
+
+def version_timeout():
+    # A counter expiring before its fragments would only re-render them early
+    config = get_config()
+    return max(config['VERSION_TIMEOUT'], config['TIMEOUT'])
+
+
+def get_versions(post_id):
+    """``{'post': ..., 'comments': ...}`` for ``post_id`` in one cache round trip."""
+    cache = get_cache()
+    keys = {part: version_key(post_id, part) for part in PARTS}
+    found = cache.get_many(keys.values())
+    missing = [key for key in keys.values() if key not in found]
+    if missing:
+        # Start from the clock so a lost counter never reuses an old version
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=version_timeout())
+        found.update(cache.get_many(missing))
+    return {part: found[key] for part, key in keys.items()}
+
+
+def peek_versions(post_id):
+    """Like ``get_versions``, but returns ``None`` instead of creating counters."""
+    keys = {part: version_key(post_id, part) for part in PARTS}
+    found = get_cache().get_many(keys.values())
+    if len(found) < len(keys):
+        return None
+    return {part: found[key] for part, key in keys.items()}
+
+
+def bump(post_ids, part):
+    cache = get_cache()
+    for post_id in set(post_ids):
+        key = version_key(post_id, part)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=version_timeout())
+
+
+def forget(post_ids):
+    """Drop the counters of deleted posts."""
+    get_cache().delete_many([version_key(post_id, part) for post_id in set(post_ids) for part in PARTS])
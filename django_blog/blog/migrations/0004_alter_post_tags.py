@@ -12,9 +12,22 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.AlterField(
-            model_name='post',
-            name='tags',
-            field=taggit.managers.TaggableManager(help_text='A comma-separated list of tags.', through='taggit.TaggedItem', to='taggit.Tag', verbose_name='Tags'),
+        # A ManyToManyField cannot be altered into a TaggableManager in place: drop the
+        # old blog_post_tags table, then record the new field in the migration state only
+        # (taggit's TaggedItem table already exists).
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RemoveField(
+                    model_name='post',
+                    name='tags',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='tags',
+                    field=taggit.managers.TaggableManager(help_text='A comma-separated list of tags.', through='taggit.TaggedItem', to='taggit.Tag', verbose_name='Tags'),
+                ),
+            ],
         ),
     ]
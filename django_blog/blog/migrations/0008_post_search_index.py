@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:49
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from blog.search import create_fts_table, fill_fts_table
+
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    content_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    with schema_editor.connection.cursor() as cursor:
+        create_fts_table(cursor)
+        # Before the first post_migrate there is no content type, and so no tagged posts
+        fill_fts_table(cursor, content_type.pk if content_type else -1)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from blog.search import FTS_TABLE
+
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_published_idx'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
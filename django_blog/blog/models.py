@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from taggit.managers import TaggableManager  
+from taggit.models import Tag as TaggitTag, TaggedItem
 
 # Create your models here.
 class Tag(models.Model):
@@ -9,6 +12,12 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
     
+class PostQuerySet(models.QuerySet):
+    def with_listing(self):
+        # Everything post_list.html reads: the author and the tags
+        return self.select_related('author').prefetch_related('tags')
+
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
@@ -16,6 +25,14 @@ class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     tags = TaggableManager()  
 
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset cursor of the post feeds (see blog.pagination)
+            models.Index(fields=['-published_date', '-id'], name='blog_post_published_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -27,4 +44,130 @@ class Comment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f'Comment by {self.author.username} on {self.post.title}'
\ No newline at end of file
+        return f'Comment by {self.author.username} on {self.post.title}'
+
+
+# Keep the search index (blog.search) in step with posts and their tags
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .search import get_backend
+    get_backend().index([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    from .search import get_backend
+    get_backend().remove([instance.pk])
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def reindex_post_tags(sender, instance, action, **kwargs):
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        from .search import get_backend
+        get_backend().index([instance])
+
+
+@receiver(post_save, sender=TaggitTag)
+def reindex_renamed_tag(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    from .search import get_backend
+    get_backend().index(Post.objects.filter(tags=instance))
+
+
+@receiver(pre_delete, sender=TaggitTag)
+def remember_tagged_posts(sender, instance, **kwargs):
+    instance._tagged_post_ids = list(Post.objects.filter(tags=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=TaggitTag)
+def reindex_deleted_tag(sender, instance, **kwargs):
+    from .search import get_backend
+    get_backend().index(Post.objects.filter(pk__in=getattr(instance, '_tagged_post_ids', [])))
+
+
+# Retire cached post_detail fragments (blog.fragments) when what they show changes
+
+@receiver(post_save, sender=Post)
+def bump_post_fragments(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .fragments import bump
+    bump([instance.pk], 'post')
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def bump_post_tag_fragments(sender, instance, action, **kwargs):
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        from .fragments import bump
+        bump([instance.pk], 'post')
+
+
+@receiver(post_save, sender=TaggitTag)
+def bump_renamed_tag_fragments(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    from .fragments import bump
+    bump(Post.objects.filter(tags=instance).values_list('pk', flat=True), 'post')
+
+
+@receiver(post_delete, sender=TaggitTag)
+def bump_deleted_tag_fragments(sender, instance, **kwargs):
+    from .fragments import bump
+    bump(getattr(instance, '_tagged_post_ids', []), 'post')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_fragments(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .fragments import bump
+    bump([instance.post_id], 'comments')
+
+
+@receiver(post_save, sender=User)
+def bump_renamed_user_fragments(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Bylines show usernames; logins only save last_login
+    if created or raw or (update_fields is not None and 'username' not in update_fields):
+        return
+    from .fragments import bump
+    bump(Post.objects.filter(author=instance).values_list('pk', flat=True), 'post')
+    bump(Comment.objects.filter(author=instance).values_list('post_id', flat=True), 'comments')
+
+
+# Retire anonymous full pages (blog.page_cache); post pages follow the fragment versions above
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post_fragments(sender, instance, **kwargs):
+    from .fragments import forget
+    forget([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=TaggitTag)
+@receiver(post_delete, sender=TaggitTag)
+def bump_feed_pages(sender, raw=False, **kwargs):
+    if raw:
+        return
+    from .page_cache import bump_feed
+    bump_feed()
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def bump_feed_pages_on_tagging(sender, instance, action, **kwargs):
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        from .page_cache import bump_feed
+        bump_feed()
+
+
+@receiver(post_save, sender=User)
+def bump_feed_pages_on_rename(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw or (update_fields is not None and 'username' not in update_fields):
+        return
+    from .page_cache import bump_feed
+    bump_feed()
@@ -0,0 +1,195 @@
+"""
+Full-page cache for anonymous readers.
+
+Anonymous GETs of the post list, tag feeds and post pages get identical
+HTML, so ``anonymous_page_cache`` stores the rendered response and serves
+it without touching the ORM or the template engine. Logged-in users and
+every other method skip the cache.
+
+Each page entry records the content versions it was rendered from:
+
+* feeds use ``feed_version()``. Receivers in ``blog.models`` bump it when
+  a post is saved or deleted, when tags change and when an author is
+  renamed; comments do not appear in feeds and leave it alone;
+* post pages use the post's ``blog.fragments`` versions, so a comment
+  retires only its own post's page. They are only read here: the counters
+  are created when the post page renders its fragments, which a missing
+  post never gets to, so probing made-up pks leaves nothing behind. Until
+  they exist (``versions_func`` returns ``None``) the page is rendered
+  without caching.
+
+An entry is fresh while its versions are current and it is younger than
+``TTL``. Past that, one request takes a short lock (``cache.add``) and
+renders the page again. Meanwhile other requests are served the stale
+copy, marked ``X-Page-Cache: STALE``. They do not stampede the database.
+With no copy at all, the other requests wait up to ``WAIT`` seconds for
+the lock holder's page, then render it themselves.
+
+Pages are keyed on the path and the query parameters the view reads
+(``before`` / ``after`` on the feeds, none on post pages). Other parameters
+are dropped before the view runs, so junk query strings share the
+canonical entry instead of filling the cache with copies.
+
+Versions, pages and the revalidation lock live in ``CACHE_ALIAS``, which
+every worker process must share (Redis, memcached); with a per-process
+cache neither invalidation nor the lock reaches the other workers.
+``manage.py check --deploy`` reports such a cache as ``blog.E002``.
+
+Configured through the ``BLOG_PAGE_CACHE`` setting::
+
+    BLOG_PAGE_CACHE = {
+        'ENABLED': True,
+        'CACHE_ALIAS': 'default',
+        'TTL': 60,            # seconds a page is served without rechecking
+        'STALE_TTL': 600,     # how long a stale copy may stand in
+        'LOCK_TIMEOUT': 10,   # seconds; covers one render
+        'WAIT': 2.0,          # seconds to wait on a cold page
+    }
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, QueryDict
+from django.utils.http import urlencode
+
+from . import fragments
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TTL': 60,
+    'STALE_TTL': 600,
+    'LOCK_TIMEOUT': 10,
+    'WAIT': 2.0,
+}
+
+FEED_VERSION_KEY = 'blog:pages:feed'
+POLL_INTERVAL = 0.05
+CACHED_HEADERS = ('Content-Type', 'Content-Language')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_PAGE_CACHE', {})}
+
+
+def get_cache():
+    return caches[get_config()['CACHE_ALIAS']]
+
+
+def feed_version():
+    cache = get_cache()
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost counter never reuses an old version
+        cache.add(FEED_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(FEED_VERSION_KEY)
+    return version
+
+
+def bump_feed():
+    cache = get_cache()
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        cache.add(FEED_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def feed_versions(request, **kwargs):
+    return [feed_version()]
+
+
+def post_versions(request, pk, **kwargs):
+    versions = fragments.peek_versions(pk)
+    if versions is None:
+        return None
+    return [versions[part] for part in fragments.PARTS]
+
+
+def cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+        and 'no-store' not in response.get('Cache-Control', '')
+    )
+
+
+def to_entry(response, versions, now, ttl):
+    return {
+        'versions': versions,
+        'expires': now + ttl,
+        'content': response.content,
+        'headers': {name: response[name] for name in CACHED_HEADERS if name in response},
+    }
+
+
+def from_entry(entry, state):
+    response = HttpResponse(entry['content'])
+    for name, value in entry['headers'].items():
+        response[name] = value
+    response['X-Page-Cache'] = state
+    return response
+
+
+def anonymous_page_cache(versions_func, params=()):
+    """
+    View decorator caching anonymous GET/HEAD responses. ``versions_func``
+    gets the view arguments and returns the content versions the page
+    depends on, or ``None`` when they do not exist yet; ``params`` names the
+    query parameters the view reads.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            config = get_config()
+            if not config['ENABLED'] or request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            cache = get_cache()
+            query = urlencode([(name, value) for name in params for value in request.GET.getlist(name)])
+            # The view sees only the parameters that make up the key
+            request.GET = QueryDict(query)
+            digest = hashlib.sha1(f'{request.path}?{query}'.encode('utf-8')).hexdigest()
+            key = f'blog:pages:{digest}'
+            lock_key = f'{key}:lock'
+            versions = versions_func(request, *args, **kwargs)
+            if versions is None:
+                # Nothing cached can match; the render creates the versions
+                response = view(request, *args, **kwargs)
+                response['X-Page-Cache'] = 'MISS'
+                return response
+
+            entry = cache.get(key)
+            if entry is not None and entry['versions'] == versions and time.time() < entry['expires']:
+                return from_entry(entry, 'HIT')
+
+            if not cache.add(lock_key, 1, timeout=config['LOCK_TIMEOUT']):
+                # Someone else is rendering this page
+                if entry is not None:
+                    return from_entry(entry, 'STALE')
+                deadline = time.monotonic() + config['WAIT']
+                while time.monotonic() < deadline:
+                    time.sleep(POLL_INTERVAL)
+                    entry = cache.get(key)
+                    if entry is not None and entry['versions'] == versions:
+                        return from_entry(entry, 'HIT')
+                return view(request, *args, **kwargs)
+
+            try:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+                if cacheable(response):
+                    now = time.time()
+                    cache.set(key, to_entry(response, versions, now, config['TTL']),
+                              timeout=config['TTL'] + config['STALE_TTL'])
+                response['X-Page-Cache'] = 'MISS'
+                return response
+            finally:
+                cache.delete(lock_key)
+        return wrapper
+    return decorator
@@ -0,0 +1,112 @@
+"""
+Keyset pagination for the post feeds.
+
+Feeds are ordered newest first on ``(published_date, id)``. A page is
+fetched with ``WHERE (published_date, id) < (:date, :id) LIMIT n + 1``,
+which seeks into the ``blog_post_published_idx`` index: page N costs the
+same as page 1, no ``COUNT(*)`` is run, and posts published while someone
+is paging do not shift the following pages.
+
+``?before=<cursor>`` pages towards older posts and ``?after=<cursor>``
+back towards newer ones. A cursor is an opaque token for the boundary
+post.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils.http import urlencode
+
+
+def encode_cursor(post):
+    raw = f'{post.published_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        published_date, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(published_date), int(pk)
+    except (ValueError, UnicodeError):
+        raise Http404('Invalid page cursor.')
+
+
+class KeysetPage:
+    """Stands in for ``page_obj`` in the feed templates."""
+
+    def __init__(self, object_list, has_next, has_previous, request):
+        self.object_list = object_list
+        self.request = request
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def link(self, param, post):
+        query = self.request.GET.copy()
+        query.pop('before', None)
+        query.pop('after', None)
+        query[param] = encode_cursor(post)
+        return '?' + urlencode(query, doseq=True)
+
+    @property
+    def next_link(self):
+        return self.link('before', self.object_list[-1]) if self._has_next else None
+
+    @property
+    def previous_link(self):
+        return self.link('after', self.object_list[0]) if self._has_previous else None
+
+
+class KeysetPaginationMixin:
+    """
+    ``ListView`` mixin replacing page numbers with ``(published_date, id)``
+    cursors. Templates get ``page_obj`` with ``next_link`` / ``previous_link``.
+    """
+    paginate_by = 10
+
+    def paginate_queryset(self, queryset, page_size):
+        before = self.request.GET.get('before')
+        after = self.request.GET.get('after')
+        reverse = bool(after) and not before
+        token = after if reverse else before
+
+        if reverse:
+            queryset = queryset.order_by('published_date', 'pk')
+        else:
+            queryset = queryset.order_by('-published_date', '-pk')
+        if token:
+            published_date, pk = decode_cursor(token)
+            lookup = 'gt' if reverse else 'lt'
+            # The leading range lets the database seek the index instead of scanning it
+            queryset = queryset.filter(**{f'published_date__{lookup}e': published_date}).filter(
+                Q(**{f'published_date__{lookup}': published_date}) | Q(**{f'pk__{lookup}': pk})
+            )
+
+        # One extra row tells whether another page follows
+        posts = list(queryset[:page_size + 1])
+        has_more = len(posts) > page_size
+        posts = posts[:page_size]
+        if reverse:
+            posts.reverse()
+            has_next, has_previous = bool(posts), has_more
+        else:
+            has_next, has_previous = has_more, bool(token) and bool(posts)
+
+        page = KeysetPage(posts, has_next, has_previous, self.request)
+        return None, page, posts, page.has_other_pages()
@@ -0,0 +1,254 @@
+"""
+Full-text search over post titles, content and tag names.
+
+``SearchResultsView`` used to OR three ``icontains`` lookups across the
+taggit join, which reads every post body on every search. Posts are now
+kept in a search index that a backend maintains and queries:
+
+* ``SQLiteFTSBackend`` (the default on SQLite) stores one row per post in
+  the ``blog_post_fts`` FTS5 table, keyed by the post id. Every search word
+  is matched as a prefix, all words must match, and results are ranked by
+  BM25 with title and tag hits weighted above content hits. Titles and
+  content excerpts come back with the matched words in ``<mark>``.
+* ``DatabaseSearchBackend`` is the portable fallback used on other
+  databases. It has no index; it filters with ``icontains`` and orders
+  newest first.
+
+Other engines plug in through ``BLOG_SEARCH['BACKEND']`` with the same
+five methods. Receivers in ``blog.models`` update the index when a post is
+saved or deleted, when its tags change and when a tag is renamed.
+
+Configured through the ``BLOG_SEARCH`` setting::
+
+    BLOG_SEARCH = {
+        'BACKEND': None,            # dotted path; None picks one for the database
+        'WEIGHTS': (10.0, 1.0, 5.0),  # BM25 weights of title, content, tags
+        'SNIPPET_WORDS': 24,
+    }
+"""
+import re
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+DEFAULTS = {
+    'BACKEND': None,
+    'WEIGHTS': (10.0, 1.0, 5.0),
+    'SNIPPET_WORDS': 24,
+}
+
+FTS_TABLE = 'blog_post_fts'
+TERM_RE = re.compile(r'\w+')
+MAX_TERMS = 10
+# Private-use characters mark matches, so the text can be escaped before <mark> goes in
+MATCH_START, MATCH_END = '\ue000', '\ue001'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BLOG_SEARCH', {})}
+
+
+def get_backend():
+    path = get_config()['BACKEND']
+    if path is None:
+        path = 'blog.search.SQLiteFTSBackend' if connection.vendor == 'sqlite' else 'blog.search.DatabaseSearchBackend'
+    return import_string(path)()
+
+
+def search_terms(query):
+    return TERM_RE.findall(query or '')[:MAX_TERMS]
+
+
+def marked(text):
+    """Escape ``text`` and turn the match markers into ``<mark>`` tags."""
+    html = escape(text).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+    return mark_safe(html)
+
+
+def tag_names(post_ids):
+    """``{post id: 'tag tag ...'}`` for ``post_ids`` in one query."""
+    from django.contrib.contenttypes.models import ContentType
+    from taggit.models import TaggedItem
+
+    from .models import Post
+
+    names = {}
+    rows = TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Post), object_id__in=list(post_ids),
+    ).values_list('object_id', 'tag__name')
+    for post_id, name in rows:
+        names.setdefault(post_id, []).append(name)
+    return {post_id: ' '.join(sorted(tags)) for post_id, tags in names.items()}
+
+
+def create_fts_table(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}"
+        f" USING fts5(title, content, tags, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+def fill_fts_table(cursor, post_content_type_id):
+    """Re-index every post in one statement; plain SQL, so migrations can use it."""
+    cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    cursor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, title, content, tags)"
+        " SELECT post.id, post.title, post.content, COALESCE(("
+        "   SELECT group_concat(tag.name, ' ') FROM taggit_taggeditem item"
+        "   JOIN taggit_tag tag ON tag.id = item.tag_id"
+        "   WHERE item.content_type_id = %s AND item.object_id = post.id"
+        " ), '') FROM blog_post post",
+        [post_content_type_id],
+    )
+
+
+@dataclass
+class SearchHit:
+    post_id: int
+    title: str
+    snippet: str
+
+
+class SQLiteFTSBackend:
+    def index(self, posts):
+        posts = list(posts)
+        if not posts:
+            return
+        tags = tag_names(post.pk for post in posts)
+        with connection.cursor() as cursor:
+            self._delete(cursor, [post.pk for post in posts])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+                [(post.pk, post.title, post.content, tags.get(post.pk, '')) for post in posts],
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            self._delete(cursor, list(post_ids))
+
+    def rebuild(self):
+        from django.contrib.contenttypes.models import ContentType
+
+        from .models import Post
+
+        with connection.cursor() as cursor:
+            fill_fts_table(cursor, ContentType.objects.get_for_model(Post).pk)
+
+    def count(self, query):
+        match = self._match(query)
+        if match is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+            return cursor.fetchone()[0]
+
+    def search(self, query, offset, limit):
+        match = self._match(query)
+        if match is None:
+            return []
+        config = get_config()
+        weights = ', '.join(str(float(weight)) for weight in config['WEIGHTS'])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, highlight({FTS_TABLE}, 0, %s, %s),"
+                f" snippet({FTS_TABLE}, 1, %s, %s, '…', %s)"
+                f" FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+                f" ORDER BY bm25({FTS_TABLE}, {weights}), rowid DESC LIMIT %s OFFSET %s",
+                [MATCH_START, MATCH_END, MATCH_START, MATCH_END, config['SNIPPET_WORDS'], match, limit, offset],
+            )
+            return [SearchHit(pk, marked(title), marked(snippet)) for pk, title, snippet in cursor.fetchall()]
+
+    def _match(self, query):
+        terms = search_terms(query)
+        if not terms:
+            return None
+        # Quoted, so words like AND / NEAR stay plain words; * makes each a prefix
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def _delete(self, cursor, post_ids):
+        if post_ids:
+            placeholders = ', '.join(['%s'] * len(post_ids))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', post_ids)
+
+
+class DatabaseSearchBackend:
+    """Index-free fallback for databases without a dedicated backend."""
+
+    def index(self, posts):
+        pass
+
+    def remove(self, post_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def queryset(self, query):
+        from django.db.models import Q
+
+        from .models import Post
+
+        terms = search_terms(query)
+        if not terms:
+            return Post.objects.none()
+        matches = Post.objects.all()
+        for term in terms:
+            matches = matches.filter(
+                Q(title__icontains=term) | Q(content__icontains=term) | Q(tags__name__icontains=term)
+            )
+        return Post.objects.filter(pk__in=matches.values('pk'))
+
+    def count(self, query):
+        return self.queryset(query).count()
+
+    def search(self, query, offset, limit):
+        terms = search_terms(query)
+        pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        wrap = lambda text: pattern.sub(lambda match: MATCH_START + match.group(0) + MATCH_END, text)  # noqa: E731
+        words = get_config()['SNIPPET_WORDS']
+        posts = self.queryset(query).order_by('-published_date', '-pk')[offset:offset + limit]
+        return [
+            SearchHit(post.pk, marked(wrap(post.title)), marked(wrap(Truncator(post.content).words(words))))
+            for post in posts.only('pk', 'title', 'content')
+        ]
+
+
+class SearchResults:
+    """
+    Lazy, sliceable sequence of matching posts for Django's ``Paginator``.
+    Each post carries ``search_title`` and ``search_snippet`` (safe HTML).
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.backend = backend or get_backend()
+
+    def __len__(self):
+        return self.count()
+
+    def count(self):
+        if not hasattr(self, '_count'):
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        from .models import Post
+
+        offset = index.start or 0
+        limit = max((index.stop if index.stop is not None else self.count()) - offset, 0)
+        hits = self.backend.search(self.query, offset, limit)
+        posts = Post.objects.with_listing().in_bulk([hit.post_id for hit in hits])
+        results = []
+        for hit in hits:
+            post = posts.get(hit.post_id)
+            if post is not None:
+                post.search_title, post.search_snippet = hit.title, hit.snippet
+                results.append(post)
+        return results
@@ -0,0 +1,34 @@
+import re
+
+from django import template
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CONTROLS_RE = re.compile(r'<!--comment-controls:(\d+):(\d+)-->')
+
+
+@register.simple_tag
+def comment_controls_placeholder(comment):
+    """Marks where ``comment_controls`` puts the Edit / Delete links of ``comment``."""
+    return mark_safe(f'<!--comment-controls:{comment.pk}:{comment.author_id}-->')
+
+
+@register.filter
+def comment_controls(html, user):
+    """Fill the placeholders of a cached comment thread for ``user``."""
+    user_id = user.pk if user.is_authenticated else None
+
+    def controls(match):
+        comment_id, author_id = match.groups()
+        if int(author_id) != user_id:
+            return ''
+        return format_html(
+            ' | <a href="{}">Edit</a> | <a href="{}">Delete</a>',
+            reverse('comment-update', args=[comment_id]),
+            reverse('comment-delete', args=[comment_id]),
+        )
+
+    return mark_safe(CONTROLS_RE.sub(controls, str(html)))
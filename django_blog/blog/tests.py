@@ -1,3 +1,362 @@
-from django.test import TestCase
+import hashlib
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from .models import Comment, Post
+
+
+class PostQueryCountTestCase(TestCase):
+    # List and detail pages must not run queries per post or per comment
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.authors = [User.objects.create(username=f'author{i}') for i in range(3)]
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(title=f'Post {i}', content='Body', author=self.authors[i % 3])
+            post.tags.add('django', f'tag{i % 4}')
+        return post
+
+    def test_post_list_query_count_is_constant(self):
+        self.create_posts(5)
+        # Posts with their authors, then all their tags
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('posts'))
+        self.assertContains(response, '#django', count=5)
+        self.create_posts(45)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('posts'))
+        self.assertContains(response, '#django', count=10)
+        self.assertContains(response, 'By author2')
+
+    def test_tag_listing_prefetches(self):
+        self.create_posts(8)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('posts-by-tag', args=['tag1']))
+        self.assertContains(response, 'class="post"', count=2)
+
+    def test_post_detail_query_count_is_constant(self):
+        post = self.create_posts(1)
+        Comment.objects.create(post=post, author=self.authors[1], content='First!')
+        # Post with its author, tags, comments with their authors
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('post-detail', args=[post.pk]))
+        self.assertContains(response, 'Comments (1)')
+        for i in range(20):
+            Comment.objects.create(post=post, author=self.authors[i % 3], content=f'Comment {i}')
+        # The post body fragment is still cached, so only the comments are read again
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('post-detail', args=[post.pk]))
+        self.assertContains(response, 'Comments (21)')
+        self.assertContains(response, 'By author1 on', count=8)
+
+
+class KeysetFeedTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        now = timezone.now()
+        for i in range(25):
+            post = Post.objects.create(title=f'Post {i:02}', content='Body', author=self.author)
+            post.tags.add('feed' if i % 2 else 'other')
+            # Pairs of posts share a timestamp, so the id tiebreak matters
+            Post.objects.filter(pk=post.pk).update(published_date=now - timedelta(minutes=100 - i // 2))
+
+    def titles(self, response):
+        return [post.title for post in response.context['posts']]
+
+    def test_pages_follow_cursors(self):
+        first = self.client.get(reverse('posts'))
+        self.assertEqual(self.titles(first), [f'Post {i:02}' for i in range(24, 14, -1)])
+        self.assertFalse(first.context['page_obj'].has_previous())
+
+        second = self.client.get(reverse('posts') + first.context['page_obj'].next_link)
+        self.assertEqual(self.titles(second), [f'Post {i:02}' for i in range(14, 4, -1)])
+        third = self.client.get(reverse('posts') + second.context['page_obj'].next_link)
+        self.assertEqual(self.titles(third), [f'Post {i:02}' for i in range(4, -1, -1)])
+        self.assertFalse(third.context['page_obj'].has_next())
+
+        back = self.client.get(reverse('posts') + third.context['page_obj'].previous_link)
+        self.assertEqual(self.titles(back), self.titles(second))
+
+    def test_new_posts_do_not_shift_pages(self):
+        first = self.client.get(reverse('posts'))
+        Post.objects.create(title='Breaking', content='Body', author=self.author)
+        second = self.client.get(reverse('posts') + first.context['page_obj'].next_link)
+        self.assertEqual(self.titles(second)[0], 'Post 14')
+
+    def test_tag_feed_and_bad_cursor(self):
+        response = self.client.get(reverse('posts-by-tag', args=['feed']))
+        self.assertEqual(self.titles(response), [f'Post {i:02}' for i in range(23, 3, -2)])
+        response = self.client.get(reverse('posts-by-tag', args=['feed']) + response.context['page_obj'].next_link)
+        self.assertEqual(self.titles(response), ['Post 03', 'Post 01'])
+        self.assertEqual(self.client.get(reverse('posts') + '?before=nonsense').status_code, 404)
+
+    def test_deep_pages_seek_the_index(self):
+        from django.test.utils import CaptureQueriesContext
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plans are checked on SQLite')
+        first = self.client.get(reverse('posts'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts') + first.context['page_obj'].next_link)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('SEARCH blog_post USING INDEX blog_post_published_idx (published_date<?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class PostSearchTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.django = Post.objects.create(title='Django tips', content='Use select_related for foreign keys.',
+                                          author=self.author)
+        self.python = Post.objects.create(title='Weekend notes', content='Mostly about Django <script> tags.',
+                                          author=self.author)
+        self.python.tags.add('python')
+
+    def search(self, query):
+        response = self.client.get(reverse('search'), {'q': query})
+        return response, [post.title for post in response.context['posts']]
+
+    def test_ranked_prefix_search_with_highlights(self):
+        response, titles = self.search('djan')
+        # A title match outranks a content match
+        self.assertEqual(titles, ['Django tips', 'Weekend notes'])
+        self.assertContains(response, '<mark>Django</mark> tips')
+        # Post text is escaped around the highlights
+        self.assertContains(response, '&lt;script&gt;')
+        self.assertNotContains(response, '<script>')
+        self.assertEqual(self.search('django foreign')[1], ['Django tips'])
+        self.assertEqual(self.search('"AND" OR')[1], [])
+
+    def test_index_follows_posts_and_tags(self):
+        self.assertEqual(self.search('python')[1], ['Weekend notes'])
+        self.django.tags.add('python')
+        self.assertEqual(sorted(self.search('python')[1]), ['Django tips', 'Weekend notes'])
+        self.python.tags.remove('python')
+        self.assertEqual(self.search('python')[1], ['Django tips'])
+
+        self.django.title = 'Query tuning'
+        self.django.save()
+        self.assertEqual(self.search('tuning')[1], ['Query tuning'])
+        self.django.delete()
+        self.assertEqual(self.search('tuning')[1], [])
+
+    def test_results_are_paged(self):
+        for i in range(12):
+            Post.objects.create(title=f'Paging {i}', content='Body', author=self.author)
+        # Match count, ranked page, its posts with authors, their tags
+        with self.assertNumQueries(4):
+            response, titles = self.search('paging')
+        self.assertEqual(len(titles), 10)
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+        self.assertContains(response, '?q=paging&amp;page=2')
+        response = self.client.get(reverse('search'), {'q': 'paging', 'page': 2})
+        self.assertEqual(len(response.context['posts']), 2)
+
+    def test_portable_backend(self):
+        with override_settings(BLOG_SEARCH={'BACKEND': 'blog.search.DatabaseSearchBackend'}):
+            response, titles = self.search('django')
+        self.assertEqual(titles, ['Weekend notes', 'Django tips'])
+        self.assertContains(response, '<mark>Django</mark> &lt;script&gt;')
+
+
+@override_settings(BLOG_PAGE_CACHE={'ENABLED': False})
+class PostDetailFragmentTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = User.objects.create_user(username='author', password='pass')
+        self.reader = User.objects.create_user(username='reader', password='pass')
+        self.post = Post.objects.create(title='Cached', content='Body', author=self.author)
+        self.post.tags.add('django')
+        self.comment = Comment.objects.create(post=self.post, author=self.reader, content='Nice')
+        self.url = reverse('post-detail', args=[self.post.pk])
+
+    def test_fragments_are_reused_until_their_version_changes(self):
+        self.client.get(self.url)
+        # Only the post row itself
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        Comment.objects.create(post=self.post, author=self.author, content='Thanks')
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Comments (2)')
+        self.assertContains(response, 'Thanks')
+
+        self.post.tags.add('caching')
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertContains(response, '#caching')
+
+        self.post.title = 'Renamed'
+        self.post.save()
+        self.assertContains(self.client.get(self.url), '<h2>Renamed</h2>')
+
+        self.comment.delete()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Comments (1)')
+        self.assertNotContains(response, 'Nice')
+
+    def test_version_counters_expire_and_go_with_their_post(self):
+        from unittest import mock
+        from .fragments import PARTS, get_cache, get_versions, version_key
+
+        keys = [version_key(self.post.pk, part) for part in PARTS]
+        get_cache().delete_many(keys)
+        with mock.patch.object(get_cache(), 'add', wraps=get_cache().add) as add:
+            get_versions(self.post.pk)
+        self.assertEqual([call.kwargs['timeout'] for call in add.call_args_list], [24 * 3600] * 2)
+
+        self.post.delete()
+        self.assertEqual(get_cache().get_many(keys), {})
+
+    def test_per_user_controls_render_around_cached_fragments(self):
+        edit_comment = reverse('comment-update', args=[self.comment.pk])
+        edit_post = reverse('post-update', args=[self.post.pk])
+
+        response = self.client.get(self.url)
+        self.assertNotContains(response, edit_comment)
+        self.assertNotContains(response, 'comment-controls')
+        self.assertContains(response, 'to add a comment')
+
+        self.client.login(username='reader', password='pass')
+        response = self.client.get(self.url)
+        self.assertContains(response, edit_comment)
+        self.assertNotContains(response, edit_post)
+        self.assertContains(response, 'Add a Comment')
+
+        self.client.login(username='author', password='pass')
+        response = self.client.get(self.url)
+        self.assertNotContains(response, edit_comment)
+        self.assertContains(response, edit_post)
+
+    def test_renamed_commenter_refreshes_comments(self):
+        self.client.get(self.url)
+        self.reader.username = 'critic'
+        self.reader.save()
+        self.assertContains(self.client.get(self.url), 'By critic on')
+
+    def test_deploy_check_requires_shared_cache(self):
+        from .checks import check_fragment_cache
+
+        self.assertEqual([error.id for error in check_fragment_cache(None)], ['blog.E001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                              'LOCATION': '/tmp/blog-cache-check'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_fragment_cache(None), [])
+
+
+class AnonymousPageCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = User.objects.create_user(username='author', password='pass')
+        self.post = Post.objects.create(title='First', content='Body', author=self.author)
+        self.post.tags.add('django')
+        self.other = Post.objects.create(title='Second', content='Body', author=self.author)
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        # A post's first render creates its versions; nothing is cached before that
+        self.client.get(reverse('post-detail', args=[self.post.pk]))
+        for url in [reverse('posts'), reverse('posts-by-tag', args=['django']),
+                    reverse('post-detail', args=[self.post.pk])]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url)['X-Page-Cache'], 'MISS')
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'HIT')
+                self.assertContains(response, 'First')
+
+    def test_writes_retire_only_dependent_pages(self):
+        first, second = (reverse('post-detail', args=[post.pk]) for post in (self.post, self.other))
+        for url in (reverse('posts'), first, second, first, second):
+            self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.author, content='New comment')
+        self.assertEqual(self.client.get(reverse('posts'))['X-Page-Cache'], 'HIT')
+        self.assertEqual(self.client.get(second)['X-Page-Cache'], 'HIT')
+        response = self.client.get(first)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'New comment')
+
+        Post.objects.create(title='Third', content='Body', author=self.author)
+        self.assertContains(self.client.get(reverse('posts')), 'Third')
+
+    def test_missing_posts_create_no_versions(self):
+        from . import fragments
+
+        url = reverse('post-detail', args=[self.post.pk])
+        self.assertEqual(self.client.get(reverse('post-detail', args=[999])).status_code, 404)
+        self.assertIsNone(fragments.peek_versions(999))
+        self.client.get(url)
+        self.assertIsNotNone(fragments.peek_versions(self.post.pk))
+
+        self.client.get(url)
+        self.post.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertIsNone(fragments.peek_versions(self.post.pk))
+
+    def test_unused_query_parameters_share_the_canonical_entry(self):
+        url = reverse('posts')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url + '?utm_source=feed&x=1')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+        # Junk never reaches the page links; pagination cursors are part of the key
+        for number in range(10):
+            Post.objects.create(title=f'Post {number}', content='Body', author=self.author)
+        response = self.client.get(url + '?x=1')
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, '?before=')
+        self.assertNotContains(response, 'x=1')
+        older = response.context['page_obj'].next_link
+        self.assertEqual(self.client.get(url + older)['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url + older + '&x=1')['X-Page-Cache'], 'HIT')
+
+    def test_deploy_check_requires_shared_cache(self):
+        from .checks import check_page_cache
+
+        self.assertEqual([error.id for error in check_page_cache(None)], ['blog.E002'])
+        with override_settings(BLOG_PAGE_CACHE={'ENABLED': False}):
+            self.assertEqual(check_page_cache(None), [])
+
+    def test_logged_in_users_bypass_the_cache(self):
+        url = reverse('post-detail', args=[self.post.pk])
+        self.client.get(url)
+        self.client.login(username='author', password='pass')
+        response = self.client.get(url)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, reverse('post-update', args=[self.post.pk]))
+
+    def test_stale_copy_is_served_while_another_request_revalidates(self):
+        url = reverse('posts')
+        self.client.get(url)
+        Post.objects.create(title='Third', content='Body', author=self.author)
+        digest = hashlib.sha1(f'{url}?'.encode('utf-8')).hexdigest()
+        # Another worker holds the regeneration lock
+        cache.add(f'blog:pages:{digest}:lock', 1)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'STALE')
+        self.assertNotContains(response, 'Third')
+
+        cache.delete(f'blog:pages:{digest}:lock')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Third')
+
+        # Entries past their TTL are revalidated even when their versions still match
+        entry = cache.get(f'blog:pages:{digest}')
+        cache.set(f'blog:pages:{digest}', {**entry, 'expires': 0})
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'HIT')
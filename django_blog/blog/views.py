@@ -5,9 +5,17 @@ from .forms import CustomUserCreationForm, PostForm, ProfileEditForm, CommentFor
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView,DetailView,CreateView,UpdateView,DeleteView
 from django.urls import reverse_lazy, reverse
+from django.utils.decorators import method_decorator
 from django.shortcuts import get_object_or_404
 from .models import Post, Comment, Tag
-from django.db.models import Q
+from . import fragments
+from .page_cache import anonymous_page_cache, feed_versions, post_versions
+from .pagination import KeysetPaginationMixin
+from .search import SearchResults
+
+
+def home(request):
+    return redirect('posts')
 
 
 def register(request):
@@ -26,7 +34,7 @@ def profile(request):
     return render(request, 'blog/profile.html')
 
 @login_required
-def edit_profile(request): 
+def profile_edit(request):
     if request.method == "POST":
         form = ProfileEditForm(request.POST, instance=request.user)
         if form.is_valid():
@@ -34,18 +42,32 @@ def edit_profile(request):
             return redirect('profile')
     else:
         form = ProfileEditForm(instance=request.user)
-    return render(request, 'blog/edit_profile.html', {'form': form})
+    return render(request, 'blog/profile_edit.html', {'form': form})
 
-class PostListView(ListView):
-    model = Post
+@method_decorator(anonymous_page_cache(feed_versions, params=('before', 'after')), name='dispatch')
+class PostListView(KeysetPaginationMixin, ListView):
+    queryset = Post.objects.with_listing()  # author and tags loaded up front, no per-post queries
     template_name = 'blog/post_list.html'
     context_object_name = 'posts'
-    ordering = ['-published_date']
+    ordering = ['-published_date']  # pages follow (published_date, id) cursors
 
+@method_decorator(anonymous_page_cache(post_versions), name='dispatch')
 class PostDetailView(DetailView):
-    model = Post
+    # Body and comments are cached fragments (see blog.fragments); tags and
+    # comments are only queried when their fragment is re-rendered
+    queryset = Post.objects.select_related('author')
     template_name = 'blog/post_detail.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comment_form'] = CommentForm()
+        context['comments'] = self.object.comments.select_related('author').order_by('created_at', 'pk')
+        config = fragments.get_config()
+        context['fragment_versions'] = fragments.get_versions(self.object.pk)
+        context['fragment_timeout'] = config['TIMEOUT']
+        context['fragment_cache'] = config['CACHE_ALIAS']
+        return context
+
 class PostCreateView(LoginRequiredMixin, CreateView):  
     model = Post
     form_class = PostForm
@@ -112,14 +134,16 @@ class CommentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return reverse('post-detail', kwargs={'pk': self.object.post.pk})
     
 
-class PostByTagListView(ListView):
+@method_decorator(anonymous_page_cache(feed_versions, params=('before', 'after')), name='dispatch')
+class PostByTagListView(KeysetPaginationMixin, ListView):
     model = Post
     template_name = 'blog/post_list.html'
     context_object_name = 'posts'
 
     def get_queryset(self):
         tag_slug = self.kwargs['tag_slug'] 
-        return Post.objects.filter(tags__slug=tag_slug).distinct().order_by('-published_date')
+        # Tag slugs are unique, so the join cannot repeat a post and needs no DISTINCT
+        return Post.objects.with_listing().filter(tags__slug=tag_slug)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -127,27 +151,17 @@ class PostByTagListView(ListView):
         return context
 
 class SearchResultsView(ListView):
-    model = Post
+    # Ranked full-text matches from the search index (see blog.search), 10 per page
     template_name = 'blog/search_results.html'
     context_object_name = 'posts'
+    paginate_by = 10
 
     def get_queryset(self):
-        query = self.request.GET.get('q')
-        if query:
-            return Post.objects.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query) |
-                Q(tags__name__icontains=query)
-            ).distinct().order_by('-published_date')
-        return Post.objects.none()
-
-def search(request):
-    query = request.GET.get('q')
-    posts = Post.objects.none()
-    if query:
-        posts = Post.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(tags__name__icontains=query)
-        ).distinct()
-    return render(request, 'blog/search_results.html', {'posts': posts, 'query': query})
\ No newline at end of file
+        return SearchResults(self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+search = SearchResultsView.as_view()
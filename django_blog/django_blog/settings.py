@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,11 +39,12 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'blog',
-    'taggit'
-
+    'taggit',
+    'instrumentation',
 ]
 
 MIDDLEWARE = [
+    'instrumentation.middleware.InstrumentationMiddleware',  # first, so timings cover the whole chain
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +54,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+INSTRUMENTATION = {
+    'ENABLED': True,  # query counts, N+1 warnings, Server-Timing and /metrics/
+    'SERVER_TIMING': 'staff',  # header for staff users and DEBUG only; True for everyone, False for no one
+    'DUPLICATE_THRESHOLD': 3,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
 ROOT_URLCONF = 'django_blog.urls'
 
 TEMPLATES = [
@@ -87,6 +96,30 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Fragment versions and cached pages must be shared by every worker process,
+# or a comment saved in one worker leaves the others serving stale HTML. REDIS_URL
+# selects Redis (needs the redis package); without it the per-process cache
+# is only fit for development, and `manage.py check --deploy` reports it.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -128,3 +161,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # In settings.py
 STATIC_URL = '/static/'
+
+# Post search (see blog/search.py); BACKEND None means SQLite FTS5 on SQLite
+BLOG_SEARCH = {
+    'BACKEND': None,
+    'WEIGHTS': (10.0, 1.0, 5.0),  # BM25 weights of title, content, tags
+    'SNIPPET_WORDS': 24,
+}
+
+# Versioned post_detail fragments (see blog/fragments.py)
+BLOG_FRAGMENT_CACHE = {
+    'CACHE_ALIAS': 'default',  # must be shared between workers (see CACHES)
+    'TIMEOUT': 600,  # seconds
+    'VERSION_TIMEOUT': 24 * 3600,  # seconds; at least TIMEOUT
+}
+
+# Full pages for anonymous readers, with stale-while-revalidate (see blog/page_cache.py)
+BLOG_PAGE_CACHE = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',  # must be shared between workers (see CACHES)
+    'TTL': 60,  # seconds
+    'STALE_TTL': 600,
+    'LOCK_TIMEOUT': 10,
+    'WAIT': 2.0,
+}
@@ -0,0 +1,16 @@
+from django.conf import settings
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Who gets the Server-Timing header: False (no one), 'staff' (staff users,
+    # and everyone while DEBUG is on) or True (everyone)
+    'SERVER_TIMING': False,
+    # Identical SQL run this many times in one request is logged as a likely N+1
+    'DUPLICATE_THRESHOLD': 3,
+    # Clients allowed to scrape the metrics endpoint; None allows everyone
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'INSTRUMENTATION', {})}
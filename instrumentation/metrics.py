@@ -0,0 +1,64 @@
+"""
+Prometheus metrics for instrumented requests.
+
+Everything here is a no-op when ``prometheus_client`` is not installed; the
+``Server-Timing`` header does not depend on it.
+"""
+import os
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+if prometheus_client is not None:
+    REQUESTS = prometheus_client.Counter(
+        'django_http_requests', 'Requests by view, method and status.', ['view', 'method', 'status'],
+    )
+    DURATION = prometheus_client.Histogram(
+        'django_http_request_duration_seconds', 'Time spent in the middleware chain below '
+        'instrumentation, by view.', ['view'], buckets=LATENCY_BUCKETS,
+    )
+    RENDER = prometheus_client.Histogram(
+        'django_http_render_duration_seconds', 'Template or renderer time for responses '
+        'rendered lazily (TemplateResponse, DRF Response), by view.', ['view'], buckets=LATENCY_BUCKETS,
+    )
+    SQL = prometheus_client.Histogram(
+        'django_db_query_duration_seconds', 'Total SQL time per request, by view.', ['view'],
+        buckets=LATENCY_BUCKETS,
+    )
+    QUERIES = prometheus_client.Histogram(
+        'django_db_queries_per_request', 'Queries per request, by view.', ['view'], buckets=QUERY_BUCKETS,
+    )
+    DUPLICATES = prometheus_client.Counter(
+        'django_db_duplicate_queries', 'Queries repeating SQL already run in the same request, by view.',
+        ['view'],
+    )
+
+
+def observe(view, method, status, timing):
+    if prometheus_client is None:
+        return
+    REQUESTS.labels(view, method, status).inc()
+    DURATION.labels(view).observe(timing.total)
+    SQL.labels(view).observe(timing.sql)
+    QUERIES.labels(view).observe(timing.queries)
+    if timing.render is not None:
+        RENDER.labels(view).observe(timing.render)
+    if timing.duplicates:
+        DUPLICATES.labels(view).inc(timing.duplicates)
+
+
+def exposition():
+    """Return ``(body, content_type)`` for the metrics endpoint."""
+    registry = prometheus_client.REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # One registry per scrape, aggregated over all worker processes
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,155 @@
+"""
+Per-request query and timing instrumentation.
+
+``InstrumentationMiddleware`` wraps every database connection for the length
+of the request and records:
+
+* the number of queries and the total SQL time;
+* duplicate queries: statements whose SQL (parameters excluded) already ran
+  earlier in the same request. Statements repeated ``DUPLICATE_THRESHOLD``
+  times or more are logged as likely N+1 patterns;
+* view time, and render time for lazily rendered responses (Django's
+  ``TemplateResponse``, DRF's ``Response``).
+
+Results go to the Prometheus metrics in ``instrumentation.metrics`` and,
+when ``INSTRUMENTATION['SERVER_TIMING']`` allows it, to a ``Server-Timing``
+response header. The header exposes query counts and timings, so it is off
+by default; ``'staff'`` sends it to staff users only (everyone under
+``DEBUG``). With ``INSTRUMENTATION['ENABLED']`` false, the middleware
+removes itself from the chain at startup.
+
+Put it first in ``MIDDLEWARE`` so the timings cover the rest of the chain.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+from .conf import get_config
+
+logger = logging.getLogger('instrumentation')
+
+
+class RequestTiming:
+    """Database execute wrapper collecting one request's query statistics."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.statements = Counter()
+        self.render_started = None
+        self.render = None
+        self.total = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return self.queries - len(self.statements)
+
+    def repeated(self, threshold):
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+    def start_render(self, response):
+        self.render_started = time.perf_counter()
+        response.add_post_render_callback(self.finish_render)
+        return response
+
+    def finish_render(self, response):
+        self.render = time.perf_counter() - self.render_started
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        view = self.total - (self.render or 0)
+        entries = [
+            f'db;dur={self.sql * 1000:.2f};desc="{self.queries} queries, {self.duplicates} duplicate"',
+            f'view;dur={view * 1000:.2f}',
+        ]
+        if self.render is not None:
+            entries.append(f'render;dur={self.render * 1000:.2f}')
+        entries.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.server_timing = config['SERVER_TIMING']
+        self.duplicate_threshold = config['DUPLICATE_THRESHOLD']
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = request.instrumentation = RequestTiming()
+        with self.wrap_connections(timing):
+            response = self.get_response(request)
+        return self.finish(request, response, timing, self.send_server_timing(request))
+
+    async def __acall__(self, request):
+        # Connections are context-local, so async ORM calls of this request
+        # run through the wrappers installed here
+        timing = request.instrumentation = RequestTiming()
+        with self.wrap_connections(timing):
+            response = await self.get_response(request)
+        if self.server_timing == 'staff' and not settings.DEBUG:
+            # request.user may still need a session lookup
+            send_server_timing = await sync_to_async(self.send_server_timing)(request)
+        else:
+            send_server_timing = self.send_server_timing(request)
+        return self.finish(request, response, timing, send_server_timing)
+
+    def process_template_response(self, request, response):
+        # Called right before the handler renders the response
+        return request.instrumentation.start_render(response)
+
+    def wrap_connections(self, timing):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timing))
+        return stack
+
+    def finish(self, request, response, timing, send_server_timing):
+        timing.finish()
+        view = self.view_name(request)
+        if send_server_timing:
+            response['Server-Timing'] = timing.server_timing()
+        for sql, count in timing.repeated(self.duplicate_threshold):
+            logger.warning('Possible N+1 in %s: query ran %d times: %s', view, count, sql)
+        metrics.observe(view, request.method, response.status_code, timing)
+        return response
+
+    def send_server_timing(self, request):
+        if self.server_timing == 'staff':
+            user = getattr(request, 'user', None)
+            return settings.DEBUG or bool(user and user.is_staff)
+        return bool(self.server_timing)
+
+    def view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return '<unresolved>'
+        return match.view_name or match._func_path
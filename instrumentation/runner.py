@@ -0,0 +1,11 @@
+from django.test.runner import DiscoverRunner
+
+
+class InstrumentationDiscoverRunner(DiscoverRunner):
+    """
+    ``DiscoverRunner`` that also runs ``instrumentation``'s tests when no
+    labels are given. The app lives outside the project directory, so
+    discovery from it would never find them.
+    """
+    def build_suite(self, test_labels=None, **kwargs):
+        return super().build_suite(test_labels or ['.', 'instrumentation'], **kwargs)
@@ -0,0 +1,94 @@
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import Client, TestCase, override_settings
+from django.urls import include, path
+
+from . import metrics
+from .middleware import InstrumentationMiddleware
+
+User = get_user_model()
+
+
+def user_names(request):
+    # One query per user: a textbook N+1
+    ids = User.objects.values_list('pk', flat=True)
+    return HttpResponse(','.join(User.objects.get(pk=pk).username for pk in ids))
+
+
+def rendered(request):
+    template = engines['django'].from_string('{% for user in users %}{{ user.username }} {% endfor %}')
+    return TemplateResponse(request, template, {'users': User.objects.all()})
+
+
+urlpatterns = [
+    path('names/', user_names, name='names'),
+    path('rendered/', rendered, name='rendered'),
+    path('', include('instrumentation.urls')),
+]
+
+
+@override_settings(
+    ROOT_URLCONF=__name__, INSTRUMENTATION={'DUPLICATE_THRESHOLD': 3, 'SERVER_TIMING': True}, SECURE_SSL_REDIRECT=False
+)
+class InstrumentationMiddlewareTestCase(TestCase):
+    def setUp(self):
+        for name in ['ann', 'bob', 'cat']:
+            User.objects.create(username=name, email=f'{name}@example.com')
+
+    def test_server_timing_counts_queries_and_duplicates(self):
+        with self.assertLogs('instrumentation', 'WARNING') as logs:
+            response = self.client.get('/names/')
+        self.assertEqual(response.content, b'ann,bob,cat')
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="4 queries, 2 duplicate"', timing)
+        self.assertIn('total;dur=', timing)
+        self.assertIn('Possible N+1 in names: query ran 3 times', logs.output[0])
+
+    def test_render_time_for_template_responses(self):
+        response = self.client.get('/rendered/')
+        self.assertEqual(response.content, b'ann bob cat ')
+        self.assertIn('render;dur=', response['Server-Timing'])
+
+    def test_server_timing_off_by_default_and_staff_only(self):
+        # The middleware reads its settings once, so each block gets a new client
+        with override_settings(INSTRUMENTATION={}):
+            self.assertNotIn('Server-Timing', Client().get('/rendered/'))
+
+        with override_settings(INSTRUMENTATION={'SERVER_TIMING': 'staff'}):
+            client = Client()
+            client.force_login(User.objects.get(username='ann'))
+            self.assertNotIn('Server-Timing', client.get('/rendered/'))
+            User.objects.filter(username='ann').update(is_staff=True)
+            self.assertIn('Server-Timing', client.get('/rendered/'))
+            client.logout()
+            with override_settings(DEBUG=True):
+                self.assertIn('Server-Timing', client.get('/rendered/'))
+
+    @skipIf(metrics.prometheus_client is None, 'prometheus_client is not installed')
+    def test_metrics_endpoint(self):
+        with self.assertLogs('instrumentation', 'WARNING'):
+            self.client.get('/names/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('django_db_queries_per_request_count{view="names"}', body)
+        self.assertIn('django_db_duplicate_queries_total{view="names"}', body)
+        self.assertIn('django_http_requests_total{method="GET",status="200",view="names"}', body)
+
+    def test_metrics_endpoint_restricted_by_address(self):
+        response = self.client.get('/metrics/', REMOTE_ADDR='10.0.0.8')
+        self.assertEqual(response.status_code, 403)
+
+    def test_disabled_middleware_drops_out(self):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        with override_settings(INSTRUMENTATION={'ENABLED': False}):
+            with self.assertRaises(MiddlewareNotUsed):
+                InstrumentationMiddleware(lambda request: HttpResponse())
+            response = self.client.get('/names/')
+        self.assertNotIn('Server-Timing', response)
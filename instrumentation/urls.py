@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import prometheus_metrics
+
+app_name = 'instrumentation'
+
+urlpatterns = [
+    path('metrics/', prometheus_metrics, name='metrics'),
+]
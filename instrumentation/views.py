@@ -0,0 +1,14 @@
+from django.http import HttpResponse, HttpResponseForbidden
+
+from . import metrics
+from .conf import get_config
+
+
+def prometheus_metrics(request):
+    allowed = get_config()['METRICS_ALLOWED_IPS']
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    if metrics.prometheus_client is None:
+        return HttpResponse('prometheus_client is not installed\n', status=501, content_type='text/plain')
+    body, content_type = metrics.exposition()
+    return HttpResponse(body, content_type=content_type)